@@ -1,15 +1,42 @@
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, jsonify, request, render_template, stream_template, make_response, g
 import requests
-from bs4 import BeautifulSoup
 import time
 import threading
 import json
 import os
+import hashlib
+import hmac
+import base64
+import queue
+import uuid
+import functools
+import random
+import struct
+import gzip
+import zlib
+import csv
+import io
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-import sqlite3
-from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager, nullcontext
+import storage
+import metrics
+import parsing
+from storage import build_fts_query, like_terms
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
 import logging
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,24 +47,664 @@ app = Flask(__name__)
 PORT = int(os.environ.get('PORT', 5000))
 FLASK_ENV = os.environ.get('FLASK_ENV', 'production')
 
+# 是否在本进程参与定时爬取的主进程选举
+RUN_SCHEDULER = os.environ.get('RUN_SCHEDULER', '1') == '1'
+# 调度主进程选举使用的锁文件，以及未当选的进程重试的间隔（秒）
+SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE', storage.DB_PATH + '.scheduler.lock')
+SCHEDULER_ELECTION_INTERVAL = float(os.environ.get('SCHEDULER_ELECTION_INTERVAL', 15))
+
+# 自适应调度：各来源的爬取间隔（秒）在上下限之间按新增条数调整
+SCHEDULE_DEFAULT_INTERVAL = float(os.environ.get('SCHEDULE_DEFAULT_INTERVAL', 3600))
+SCHEDULE_MIN_INTERVAL = float(os.environ.get('SCHEDULE_MIN_INTERVAL', 300))
+SCHEDULE_MAX_INTERVAL = float(os.environ.get('SCHEDULE_MAX_INTERVAL', 6 * 3600))
+# 一次爬取新增条数达到该值时缩短间隔
+SCHEDULE_BUSY_THRESHOLD = int(os.environ.get('SCHEDULE_BUSY_THRESHOLD', 5))
+# 下次爬取时间的随机抖动比例
+SCHEDULE_JITTER = float(os.environ.get('SCHEDULE_JITTER', 0.1))
+
+# 爬取模式：concurrent 并发爬取各网站，sequential 依次爬取
+CRAWL_MODE = os.environ.get('CRAWL_MODE', 'concurrent')
+CRAWL_WORKERS = int(os.environ.get('CRAWL_WORKERS', 4))
+# 按主机限流：最大并发请求数，以及令牌桶速率（每秒请求数）和容量
+HOST_CONCURRENCY = int(os.environ.get('HOST_CONCURRENCY', 2))
+HOST_RATE = float(os.environ.get('HOST_RATE', 1))
+HOST_BURST = int(os.environ.get('HOST_BURST', 2))
+# 增量爬取：逐页翻取列表页，直到某一页全部是已入库的新闻，最多翻取 CRAWL_MAX_PAGES 页；
+# 关闭时只取第1页的前 CRAWL_PAGE_ITEMS 条
+CRAWL_INCREMENTAL = os.environ.get('CRAWL_INCREMENTAL', '1') == '1'
+CRAWL_MAX_PAGES = int(os.environ.get('CRAWL_MAX_PAGES', 5))
+CRAWL_PAGE_ITEMS = int(os.environ.get('CRAWL_PAGE_ITEMS', 10))
+# 并发获取详情页的线程数
+DETAIL_WORKERS = int(os.environ.get('DETAIL_WORKERS', 8))
+# 手动爬取任务超过该时间（秒）未更新进度视为已中断
+CRAWL_JOB_STALE_SECONDS = int(os.environ.get('CRAWL_JOB_STALE_SECONDS', 600))
+# 读接口响应缓存的最大条数
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+# 响应压缩：超过该大小（字节）的文本响应按 Accept-Encoding 压缩
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+# 首页和列表接口每页最多的条数，超出时按该值返回
+MAX_PAGE_LIMIT = int(os.environ.get('MAX_PAGE_LIMIT', 500))
+# 首页每页条数超过该值时流式渲染
+STREAM_THRESHOLD = int(os.environ.get('STREAM_THRESHOLD', 100))
+# 导出接口每次从数据库读取的条数
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+# 爬取结果每批写入的条数
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 500))
+# 新闻推送（SSE）：轮询其他进程写入的间隔（秒）、每个客户端最多缓冲的条数、心跳间隔（秒）
+STREAM_POLL_INTERVAL = float(os.environ.get('STREAM_POLL_INTERVAL', 1))
+STREAM_BUFFER_SIZE = int(os.environ.get('STREAM_BUFFER_SIZE', 1000))
+STREAM_HEARTBEAT = float(os.environ.get('STREAM_HEARTBEAT', 15))
+# 每个 worker 进程最多同时保持的推送连接数，每个连接占用一个 gunicorn 线程，应明显小于 GUNICORN_THREADS；
+# 超出时返回 503，客户端在 STREAM_BUSY_RETRY 秒后重试
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS', 8))
+STREAM_BUSY_RETRY = float(os.environ.get('STREAM_BUSY_RETRY', 30))
+# 断线重连时最多补发的条数，错过的新闻更多时只补发最新的这些条，并先发送 reset 事件
+STREAM_REPLAY_LIMIT = int(os.environ.get('STREAM_REPLAY_LIMIT', 200))
+# 列表页HTTP缓存目录，设置为空字符串可关闭缓存
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', '.http_cache')
+# 管理接口的访问令牌，未设置时管理接口关闭
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+# 近似重复检测：标题的估计相似度（Jaccard）不低于该值的新闻归为同一组
+MINHASH_THRESHOLD = float(os.environ.get('MINHASH_THRESHOLD', 0.5))
+# 规范化URL时去掉的跟踪参数（逗号分隔），utm_ 开头的参数总是去掉
+URL_TRACKING_PARAMS = set(
+    p.strip().lower() for p in
+    os.environ.get('URL_TRACKING_PARAMS', 'spm,from,src,ref,wfr,sudaref,share_from,share_token').split(',')
+    if p.strip()
+)
+
 # 数据库初始化
 def init_db():
-    conn = sqlite3.connect('finance_news.db')
-    cursor = conn.cursor()
+    """创建表、索引和触发器，可在每个 worker 启动时重复调用"""
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        # 多个 worker 同时启动时串行执行，回填数据可能较慢，延长等待写锁的时间
+        cursor.execute("PRAGMA busy_timeout = 600000")
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS news (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                content TEXT,
+                source TEXT NOT NULL,
+                url TEXT UNIQUE,
+                published_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 旧数据库升级：近似重复分组，同组新闻的 cluster_id 为组内最早一条的 id
+        cursor.execute("PRAGMA table_info(news)")
+        if 'cluster_id' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE news ADD COLUMN cluster_id INTEGER")
+        
+        # 旧数据库升级：url_key 为规范化URL去掉协议后的部分，http 与 https 视为同一链接
+        cursor.execute("PRAGMA table_info(news)")
+        if 'url_key' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE news ADD COLUMN url_key TEXT")
+            backfill_url_keys(cursor)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_news_url_key ON news (url_key)")
+        
+        # 列表按时间倒序分页、按来源筛选所需的索引
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_created_at ON news (created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_source_created_at ON news (source, created_at)")
+        # collapse=1 时查找同组更早的新闻
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_cluster ON news (cluster_id, created_at, id)")
+        
+        # 各来源的自适应调度状态
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_schedule (
+                source TEXT PRIMARY KEY,
+                interval_seconds REAL NOT NULL,
+                next_run TIMESTAMP NOT NULL,
+                last_run TIMESTAMP,
+                last_found INTEGER,
+                last_added INTEGER,
+                error_count INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        ''')
+        
+        # 数据代数：每次写入新数据后加一，用于使各进程的响应缓存失效
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_generation', 0)")
+        
+        # 全文索引，由触发器与 news 表保持同步
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'news_fts'")
+        fts_exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+                title, content, content='', tokenize='unicode61'
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS news_fts_insert AFTER INSERT ON news BEGIN
+                INSERT INTO news_fts (rowid, title, content)
+                VALUES (new.id, fts_bigrams(new.title), fts_bigrams(new.content));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS news_fts_delete AFTER DELETE ON news BEGIN
+                INSERT INTO news_fts (news_fts, rowid, title, content)
+                VALUES ('delete', old.id, fts_bigrams(old.title), fts_bigrams(old.content));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS news_fts_update AFTER UPDATE OF title, content ON news BEGIN
+                INSERT INTO news_fts (news_fts, rowid, title, content)
+                VALUES ('delete', old.id, fts_bigrams(old.title), fts_bigrams(old.content));
+                INSERT INTO news_fts (rowid, title, content)
+                VALUES (new.id, fts_bigrams(new.title), fts_bigrams(new.content));
+            END
+        ''')
+        if not fts_exists:
+            # 已有数据库首次升级时回填全文索引
+            rebuild_search_index(cursor)
+        
+        # 各来源统计汇总，由触发器增量维护，避免每次请求全表聚合
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'source_stats'")
+        stats_exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS source_stats (
+                source TEXT PRIMARY KEY,
+                news_count INTEGER NOT NULL DEFAULT 0,
+                last_update TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS source_stats_insert AFTER INSERT ON news BEGIN
+                INSERT INTO source_stats (source, news_count, last_update)
+                VALUES (new.source, 1, new.created_at)
+                ON CONFLICT (source) DO UPDATE SET
+                    news_count = news_count + 1,
+                    last_update = CASE
+                        WHEN last_update IS NULL OR excluded.last_update > last_update
+                        THEN excluded.last_update ELSE last_update
+                    END;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS source_stats_delete AFTER DELETE ON news BEGIN
+                UPDATE source_stats SET news_count = news_count - 1 WHERE source = old.source;
+                DELETE FROM source_stats WHERE source = old.source AND news_count <= 0;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS source_stats_update AFTER UPDATE OF source ON news
+            WHEN new.source IS NOT old.source BEGIN
+                UPDATE source_stats SET news_count = news_count - 1 WHERE source = old.source;
+                DELETE FROM source_stats WHERE source = old.source AND news_count <= 0;
+                INSERT INTO source_stats (source, news_count, last_update)
+                VALUES (new.source, 1, new.created_at)
+                ON CONFLICT (source) DO UPDATE SET
+                    news_count = news_count + 1,
+                    last_update = CASE
+                        WHEN last_update IS NULL OR excluded.last_update > last_update
+                        THEN excluded.last_update ELSE last_update
+                    END;
+            END
+        ''')
+        if not stats_exists:
+            rebuild_stats(cursor)
+        
+        # 近似重复检测：每条新闻的 MinHash 签名，以及按段计算的 LSH 桶号
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'news_minhash'")
+        minhash_exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS news_minhash (
+                news_id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS news_lsh (
+                bucket INTEGER NOT NULL,
+                news_id INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_lsh_bucket ON news_lsh (bucket)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_lsh_news_id ON news_lsh (news_id)")
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS news_minhash_delete AFTER DELETE ON news BEGIN
+                DELETE FROM news_minhash WHERE news_id = old.id;
+                DELETE FROM news_lsh WHERE news_id = old.id;
+            END
+        ''')
+        if not minhash_exists:
+            rebuild_clusters(cursor)
+        
+        # 手动爬取任务，保存在数据库中以便各 worker 进程共享状态
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress TEXT,
+                total_crawled INTEGER,
+                added INTEGER,
+                duplicates INTEGER,
+                error TEXT,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        
+        conn.commit()
+        cursor.execute(f"PRAGMA busy_timeout = {int(storage.DB_BUSY_TIMEOUT * 1000)}")
+    logger.info("数据库初始化完成")
+
+def rebuild_search_index(cursor):
+    """根据 news 表重建全文索引"""
+    cursor.execute("INSERT INTO news_fts (news_fts) VALUES ('delete-all')")
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS news (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            content TEXT,
-            source TEXT NOT NULL,
-            url TEXT UNIQUE,
-            published_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        INSERT INTO news_fts (rowid, title, content)
+        SELECT id, fts_bigrams(title), fts_bigrams(content) FROM news
+    ''')
+    logger.info(f"全文索引重建完成，共 {cursor.rowcount} 条新闻")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """重建新闻全文索引"""
+    init_db()
+    with storage.connection() as conn:
+        rebuild_search_index(conn.cursor())
+        conn.commit()
+
+def backfill_url_keys(cursor):
+    """为已有新闻填写 url_key，同一链接的多条记录只有最早一条保留 url_key，其余为 NULL"""
+    keys = set()
+    last_id = 0
+    total = 0
+    duplicates = 0
+    while True:
+        cursor.execute(
+            "SELECT id, url FROM news WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, INGEST_BATCH_SIZE)
         )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        updates = []
+        for news_id, url in rows:
+            key = url_key(url)
+            if key in keys:
+                duplicates += 1
+            elif key:
+                keys.add(key)
+                updates.append((key, news_id))
+        cursor.executemany("UPDATE news SET url_key = ? WHERE id = ?", updates)
+        last_id = rows[-1][0]
+        total += len(rows)
+    logger.info(f"URL键回填完成，共 {total} 条新闻，其中 {duplicates} 条与更早的新闻链接相同")
+
+def rebuild_stats(cursor):
+    """根据 news 表重建各来源统计汇总"""
+    cursor.execute("DELETE FROM source_stats")
+    cursor.execute('''
+        INSERT INTO source_stats (source, news_count, last_update)
+        SELECT source, COUNT(*), MAX(created_at) FROM news GROUP BY source
     ''')
-    conn.commit()
-    conn.close()
-    logger.info("数据库初始化完成")
+    logger.info(f"统计汇总重建完成，共 {cursor.rowcount} 个来源")
+    bump_data_generation(cursor)
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """重建各来源统计汇总"""
+    init_db()
+    with storage.connection() as conn:
+        rebuild_stats(conn.cursor())
+        conn.commit()
+
+def rebuild_clusters(cursor):
+    """重新计算全部新闻的 MinHash 签名和近似重复分组"""
+    cursor.execute("DELETE FROM news_minhash")
+    cursor.execute("DELETE FROM news_lsh")
+    cursor.execute("UPDATE news SET cluster_id = NULL WHERE cluster_id IS NOT NULL")
+    
+    last_id = 0
+    total = 0
+    while True:
+        cursor.execute(
+            "SELECT id, title FROM news WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, INGEST_BATCH_SIZE)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        assign_clusters(cursor, rows)
+        last_id = rows[-1][0]
+        total += len(rows)
+    logger.info(f"近似重复分组重建完成，共 {total} 条新闻")
+    bump_data_generation(cursor)
+
+@app.cli.command('rebuild-clusters')
+def rebuild_clusters_command():
+    """重新计算新闻近似重复分组"""
+    init_db()
+    with storage.connection() as conn:
+        rebuild_clusters(conn.cursor())
+        conn.commit()
+
+def bump_data_generation(cursor):
+    """数据发生变化后调用，使所有进程的响应缓存失效"""
+    cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_generation'")
+
+def get_data_generation():
+    """读取当前数据代数"""
+    with storage.connection() as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'data_generation'").fetchone()
+    return row[0] if row else 0
+
+def get_stats_summary(cursor):
+    """读取统计汇总，返回 (总新闻数, 各来源统计, 最后更新时间)"""
+    cursor.execute("SELECT source, news_count, last_update FROM source_stats ORDER BY news_count DESC, source")
+    rows = cursor.fetchall()
+    source_stats = [{'source': row[0], 'count': row[1]} for row in rows]
+    total_news = sum(row[1] for row in rows)
+    last_update = max((row[2] for row in rows if row[2]), default=None)
+    return total_news, source_stats, last_update
+
+def find_known_urls(urls):
+    """返回已存在于数据库中的URL集合，按 url_key 比较，http 与 https 视为同一链接"""
+    urls_by_key = {}
+    for url in urls:
+        if url:
+            urls_by_key.setdefault(url_key(url), set()).add(url)
+    keys = list(urls_by_key)
+    known = set()
+    if not keys:
+        return known
+    
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        # 分批查询，避免超过SQLite参数数量上限
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f"SELECT url_key FROM news WHERE url_key IN ({placeholders})", batch)
+            for row in cursor.fetchall():
+                known.update(urls_by_key[row[0]])
+    return known
+
+# URL规范化：同一篇文章的不同写法归为同一个URL
+def canonicalize_url(url):
+    """去掉跟踪参数和锚点，主机名转小写，去掉默认端口和路径末尾的斜杠"""
+    if not url:
+        return url
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    if not parts.netloc:
+        return url.strip()
+    
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+    
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in URL_TRACKING_PARAMS
+    ]
+    query = urlencode(sorted(params))
+    return urlunsplit((scheme, host, path, query, ''))
+
+def url_key(url):
+    """去重使用的键：规范化URL去掉协议，http 和 https 视为同一URL"""
+    if not url:
+        return url
+    return canonicalize_url(url).split('://', 1)[-1]
+
+# 已见URL集合：保存规范化URL（不含协议）的 8 字节 blake2b 摘要，
+# 首次使用时从数据库加载，写入新闻后更新。只用于在请求前快速过滤，以数据库为准
+class SeenUrls:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._digests = set()
+        self._warmed = False
+
+    @staticmethod
+    def _digest(url):
+        return SeenUrls._key_digest(url_key(url))
+
+    @staticmethod
+    def _key_digest(key):
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def _warm(self):
+        with self._lock:
+            if self._warmed:
+                return
+            # 直接读取已保存的 url_key，不再逐条规范化；url_key 为 NULL 的记录与更早的记录链接相同
+            with storage.connection() as conn:
+                cursor = conn.execute("SELECT url_key FROM news WHERE url_key IS NOT NULL")
+                digests = {self._key_digest(row[0]) for row in cursor}
+            self._digests |= digests
+            self._warmed = True
+            logger.info(f"已见URL集合加载完成，共 {len(self._digests)} 条")
+
+    def contains(self, url):
+        if not self._warmed:
+            self._warm()
+        return self._digest(url) in self._digests
+
+    def add(self, urls):
+        digests = [self._digest(url) for url in urls if url]
+        with self._lock:
+            self._digests.update(digests)
+
+seen_urls = SeenUrls()
+
+# 近似重复检测：根据标题的字符二元组计算 MinHash 签名，按 LSH 分段建索引，
+# 只有至少一段完全相同的新闻才会被比较。只使用标题是因为各来源的正文长短不一，
+# 多数来源只有占位正文
+MINHASH_BANDS = 10
+MINHASH_ROWS = 3
+MINHASH_PRIME = (1 << 61) - 1
+_minhash_random = random.Random(20240601)
+MINHASH_PERMUTATIONS = [
+    (_minhash_random.randrange(1, MINHASH_PRIME), _minhash_random.randrange(0, MINHASH_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+MINHASH_FORMAT = f'>{MINHASH_BANDS * MINHASH_ROWS}Q'
+
+def minhash(text):
+    """计算文本的 MinHash 签名，二元组少于3个时返回 None"""
+    tokens = set(storage.fts_bigrams(text).split())
+    if len(tokens) < 3:
+        return None
+    hashes = [
+        int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+        for token in tokens
+    ]
+    return [min((a * h + b) % MINHASH_PRIME for h in hashes) for a, b in MINHASH_PERMUTATIONS]
+
+def minhash_buckets(signature):
+    """将签名按 MINHASH_ROWS 个一段切分，返回各段的桶号"""
+    buckets = []
+    for band in range(MINHASH_BANDS):
+        values = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        key = hashlib.blake2b(repr((band, values)).encode('ascii'), digest_size=8).digest()
+        # SQLite 整数为有符号 64 位
+        buckets.append(int.from_bytes(key, 'big', signed=True))
+    return buckets
+
+def minhash_similarity(signature, other):
+    """由两个签名估计 Jaccard 相似度"""
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+def assign_clusters(cursor, rows):
+    """为新写入的新闻计算签名并归入近似重复分组
+    
+    rows 为 (id, title) 列表，需按 id 升序。与已有新闻的估计相似度不低于
+    MINHASH_THRESHOLD 时加入最相似的一组，组号为组内最早一条新闻的 id。
+    """
+    placeholders = ','.join('?' * MINHASH_BANDS)
+    clustered = 0
+    for news_id, title in rows:
+        signature = minhash(title)
+        if signature is None:
+            continue
+        buckets = minhash_buckets(signature)
+        
+        cursor.execute(f'''
+            SELECT m.news_id, m.signature, n.cluster_id FROM news_minhash m
+            JOIN news n ON n.id = m.news_id
+            WHERE m.news_id IN (SELECT news_id FROM news_lsh WHERE bucket IN ({placeholders}))
+        ''', buckets)
+        best = None
+        for other_id, other_signature, other_cluster in cursor.fetchall():
+            similarity = minhash_similarity(signature, struct.unpack(MINHASH_FORMAT, other_signature))
+            if similarity >= MINHASH_THRESHOLD and (best is None or similarity > best[0]):
+                best = (similarity, other_id, other_cluster)
+        
+        if best:
+            _, other_id, other_cluster = best
+            cluster_id = other_cluster or other_id
+            if other_cluster is None:
+                cursor.execute("UPDATE news SET cluster_id = ? WHERE id = ?", (cluster_id, other_id))
+            cursor.execute("UPDATE news SET cluster_id = ? WHERE id = ?", (cluster_id, news_id))
+            clustered += 1
+        
+        cursor.execute(
+            "INSERT OR REPLACE INTO news_minhash (news_id, signature) VALUES (?, ?)",
+            (news_id, struct.pack(MINHASH_FORMAT, *signature))
+        )
+        cursor.executemany(
+            "INSERT INTO news_lsh (bucket, news_id) VALUES (?, ?)",
+            [(bucket, news_id) for bucket in buckets]
+        )
+    return clustered
+
+# 令牌桶，控制请求速率
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取出一个令牌，令牌不足时等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+# 按主机限流：限制同一网站的并发请求数和请求速率
+class DomainLimiter:
+    def __init__(self, concurrency=HOST_CONCURRENCY, rate=HOST_RATE, burst=HOST_BURST):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _get(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    threading.BoundedSemaphore(self.concurrency),
+                    TokenBucket(self.rate, self.burst)
+                )
+            return self._hosts[host]
+
+    @contextmanager
+    def limit(self, url):
+        """在限流范围内执行对该主机的请求"""
+        semaphore, bucket = self._get(urlparse(url).netloc)
+        with semaphore:
+            bucket.acquire()
+            yield
+
+# 列表页HTTP缓存：保存 ETag/Last-Modified 和页面内容哈希，用于条件请求
+class HttpCache:
+    def __init__(self, cache_dir=HTTP_CACHE_DIR):
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, url):
+        """读取URL的缓存记录，不存在时返回空字典"""
+        if not self.cache_dir:
+            return {}
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, url, entry):
+        """写入URL的缓存记录"""
+        if not self.cache_dir:
+            return
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"写入HTTP缓存失败: {e}")
+
+# 各新闻源的列表页配置：
+#   list_url 第1页地址，page_url 后续分页地址模板（无分页时省略），base_url 用于补全相对链接，
+#   item 列表中每条新闻的 (标签, class)，container 新闻列表所在元素的 (标签, class)（item 不够具体、
+#   会匹配到导航等其他元素时指定，只在其中查找 item），detail 详情页正文的 (标签, class)（不抓取详情时省略），
+#   detail_chars 正文保留的字数（默认 DETAIL_MAX_CHARS）。解析时只处理这些元素，见 parsing.py
+SOURCES = {
+    '东方财富网': {
+        'list_url': 'https://finance.eastmoney.com/news/cywjh.html',
+        'page_url': 'https://finance.eastmoney.com/news/cywjh_{page}.html',
+        'base_url': 'https://finance.eastmoney.com/',
+        'item': ('p', 'title'),
+        'detail': ('div', 'newsContent'),
+        'default_content': '暂无详细内容'
+    },
+    '新浪财经': {
+        'list_url': 'https://finance.sina.com.cn/roll/index.d.html?cid=56247',
+        'page_url': 'https://finance.sina.com.cn/roll/index.d.html?cid=56247&page={page}',
+        'base_url': 'https://finance.sina.com.cn/',
+        'container': ('ul', 'list_009'),
+        'item': ('li', None),
+        'default_content': '新浪财经新闻'
+    },
+    '财经网': {
+        'list_url': 'http://www.caijing.com.cn/',
+        'base_url': 'http://www.caijing.com.cn/',
+        'item': ('h3', 'title'),
+        'default_content': '财经网新闻'
+    },
+    '界面新闻': {
+        'list_url': 'https://www.jiemian.com/lists/48.html',
+        'page_url': 'https://www.jiemian.com/lists/48_{page}.html',
+        'base_url': 'https://www.jiemian.com/',
+        'item': ('div', 'news-el'),
+        'default_content': '界面新闻财经报道'
+    }
+}
 
 # 爬虫类
 class FinanceNewsCrawler:
@@ -47,196 +714,946 @@ class FinanceNewsCrawler:
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        self.limiter = DomainLimiter()
+        self.http_cache = HttpCache()
+        # 最近一次爬取失败的来源及错误信息
+        self.errors = {}
+        # 各来源最近一次爬取中已完整处理的列表页 [(URL, 缓存记录)]，写入数据库后由 save_list_cache 保存
+        self.pending_list_cache = {}
+
+    def fetch(self, url, timeout=10, source='', page='detail', acquire=True, **kwargs):
+        """发送GET请求，遵守按主机的并发和速率限制
         
-    def crawl_dongfangcaifu(self):
-        """爬取东方财富网"""
-        news_list = []
+        source 和 page（list / detail）用于指标标签。acquire 为 False 时由调用方持有
+        该主机的限流，用于流式响应：响应体读取完毕前不能释放。
+        """
+        with self.limiter.limit(url) if acquire else nullcontext():
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=timeout, **kwargs)
+            except requests.Timeout:
+                metrics.FETCH_ERRORS.labels(source, page, 'timeout').inc()
+                raise
+            except requests.RequestException:
+                metrics.FETCH_ERRORS.labels(source, page, 'connection').inc()
+                raise
+            finally:
+                metrics.FETCH_SECONDS.labels(source, page).observe(time.perf_counter() - start)
+        if response.status_code >= 400:
+            metrics.FETCH_ERRORS.labels(source, page, 'http_status').inc()
+        return response
+    
+    def fetch_list(self, url, timeout=10, source=''):
+        """获取列表页，返回 (响应, 新的缓存记录)，页面自上次爬取后未变化时返回 (None, None)
+        
+        缓存记录不在此处保存：页面上的新闻全部写入数据库后才能保存，否则本次失败的新闻
+        在下次爬取时会因页面未变化而被跳过。
+        """
+        entry = self.http_cache.load(url)
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        response = self.fetch(url, timeout=timeout, source=source, page='list', headers=headers)
+        if response.status_code == 304:
+            logger.info(f"列表页未更新(304)，跳过: {url}")
+            return None, None
+        # 错误页面不能当作空列表处理，否则该来源被视为没有新闻，不会按失败退避
+        response.raise_for_status()
+        
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if content_hash == entry.get('content_hash'):
+            logger.info(f"列表页内容未变化，跳过: {url}")
+            return None, None
+        
+        new_entry = None
+        if response.status_code == 200:
+            new_entry = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_hash': content_hash
+            }
+        return response, new_entry
+    
+    def fetch_details(self, news_list, parse_detail):
+        """并发获取新闻详情页，调用前应已用 filter_new 去掉已见过的URL
+        
+        parse_detail 接收未读取响应体的详情页响应，返回截断后的正文文本。
+        """
+        if not news_list:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=DETAIL_WORKERS) as executor:
+            results = executor.map(lambda news: self._fetch_detail(news, parse_detail), news_list)
+            return [news for news in results if news]
+    
+    def _fetch_detail(self, news, parse_detail):
+        """获取单条新闻详情，失败时返回None"""
         try:
-            url = "https://finance.eastmoney.com/news/cywjh.html"
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 解析新闻列表
-            articles = soup.find_all('p', class_='title')
-            for article in articles[:10]:  # 只取前10条
-                link_tag = article.find('a')
-                if link_tag:
-                    title = link_tag.text.strip()
-                    url = link_tag.get('href')
-                    if url and not url.startswith('http'):
-                        url = urljoin('https://finance.eastmoney.com/', url)
-                    
-                    # 获取新闻详情
-                    try:
-                        detail_response = self.session.get(url, timeout=10)
-                        detail_soup = BeautifulSoup(detail_response.content, 'html.parser')
-                        content_elem = detail_soup.find('div', class_='newsContent')
-                        content = content_elem.text.strip() if content_elem else "暂无详细内容"
-                        
-                        news_list.append({
-                            'title': title,
-                            'content': content[:500] + "..." if len(content) > 500 else content,
-                            'source': '东方财富网',
-                            'url': url,
-                            'published_at': datetime.now().isoformat()
-                        })
-                    except Exception as e:
-                        logger.warning(f"获取东方财富网详情失败: {e}")
-                        continue
+            # 流式读取，解析到正文后不再读取页面剩余部分。响应体在解析时才下载，
+            # 读取完毕前一直占用该主机的并发名额
+            with self.limiter.limit(news['url']):
+                response = self.fetch(news['url'], source=news['source'], acquire=False, stream=True)
+                try:
+                    # 错误页面不能当作正文保存，否则该URL已入库，不会再被重新获取
+                    response.raise_for_status()
+                    news['content'] = parse_detail(response)
+                finally:
+                    response.close()
+            return news
         except Exception as e:
-            logger.error(f"爬取东方财富网失败: {e}")
+            logger.warning(f"获取{news['source']}详情失败: {e}")
+            return None
         
-        return news_list
-    
-    def crawl_sina_finance(self):
-        """爬取新浪财经"""
+    def crawl_source(self, name):
+        """按 SOURCES 配置爬取一个来源，失败时记录到 self.errors"""
+        spec = SOURCES[name]
         news_list = []
+        self.pending_list_cache.pop(name, None)
         try:
-            url = "https://finance.sina.com.cn/roll/index.d.html?cid=56247"
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if CRAWL_INCREMENTAL:
+                news_list, pages = self.crawl_until_known(name)
+            else:
+                pages = []
+                response, entry = self.fetch_list(spec['list_url'], source=name)
+                if response is not None:
+                    items = self.parse_list(name, response)[:CRAWL_PAGE_ITEMS]
+                    news_list = self.filter_new(items)
+                    metrics.CRAWL_ITEMS.labels(name, 'found').inc(len(items))
+                    metrics.CRAWL_ITEMS.labels(name, 'new').inc(len(news_list))
+                    pages.append((spec['list_url'], entry, [news['url'] for news in news_list]))
+            
+            # 获取新闻详情
+            if spec.get('detail') and news_list:
+                news_list = self.fetch_details(news_list, lambda response: self.parse_detail(name, response))
             
-            # 解析新闻列表
-            articles = soup.find_all('li')
-            for article in articles[:10]:
-                link_tag = article.find('a')
-                if link_tag:
-                    title = link_tag.text.strip()
-                    url = link_tag.get('href')
-                    if url and not url.startswith('http'):
-                        url = urljoin('https://finance.sina.com.cn/', url)
-                    
-                    news_list.append({
-                        'title': title,
-                        'content': '新浪财经新闻',
-                        'source': '新浪财经',
-                        'url': url,
-                        'published_at': datetime.now().isoformat()
-                    })
+            # 只有新闻全部取得详情的列表页才能在写入后标记为已处理
+            fetched = {news['url'] for news in news_list}
+            self.pending_list_cache[name] = [
+                (url, entry) for url, entry, urls in pages
+                if entry is not None and all(url in fetched for url in urls)
+            ]
         except Exception as e:
-            logger.error(f"爬取新浪财经失败: {e}")
+            logger.error(f"爬取{name}失败: {e}")
+            self.errors[name] = str(e)
         
         return news_list
     
-    def crawl_caijing(self):
-        """爬取财经网"""
+    def save_list_cache(self, sources=None):
+        """爬取结果写入数据库后调用，保存已完整处理的列表页的缓存记录"""
+        for name in list(self.pending_list_cache):
+            if sources is None or name in sources:
+                for url, entry in self.pending_list_cache.pop(name):
+                    self.http_cache.save(url, entry)
+    
+    def crawl_until_known(self, name):
+        """逐页爬取列表页，遇到全部已入库的一页或页面未变化时停止
+        
+        返回 (新闻列表, 各页的 (URL, 新的缓存记录, 该页新闻的URL列表))。
+        """
+        spec = SOURCES[name]
         news_list = []
-        try:
-            url = "http://www.caijing.com.cn/"
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
+        pages = []
+        page_urls = set()
+        for page in range(1, CRAWL_MAX_PAGES + 1):
+            if page == 1:
+                url = spec['list_url']
+            elif spec.get('page_url'):
+                url = spec['page_url'].format(page=page)
+            else:
+                break
             
-            # 解析新闻列表
-            articles = soup.find_all('h3', class_='title')
-            for article in articles[:10]:
-                link_tag = article.find('a')
-                if link_tag:
-                    title = link_tag.text.strip()
-                    url = link_tag.get('href')
-                    if url and not url.startswith('http'):
-                        url = urljoin('http://www.caijing.com.cn/', url)
-                    
-                    news_list.append({
-                        'title': title,
-                        'content': '财经网新闻',
-                        'source': '财经网',
-                        'url': url,
-                        'published_at': datetime.now().isoformat()
-                    })
-        except Exception as e:
-            logger.error(f"爬取财经网失败: {e}")
+            response, entry = self.fetch_list(url, source=name)
+            if response is None:
+                break
+            
+            # 翻页期间列表可能滚动，前面页已出现的URL由 filter_new 一并过滤
+            items = self.parse_list(name, response)
+            new_items = self.filter_new(items, page_urls)
+            metrics.CRAWL_ITEMS.labels(name, 'found').inc(len(items))
+            metrics.CRAWL_ITEMS.labels(name, 'new').inc(len(new_items))
+            pages.append((url, entry, [news['url'] for news in new_items]))
+            if not new_items:
+                break
+            news_list.extend(new_items)
+        
+        return news_list, pages
+    
+    def filter_new(self, news_list, batch_urls=None):
+        """去掉已见过的新闻：先查已见URL集合，剩余的再批量查数据库
+        
+        batch_urls 为本次爬取已处理的URL集合，会被更新。
+        """
+        if batch_urls is None:
+            batch_urls = set()
+        candidates = []
+        for news in news_list:
+            url = news['url']
+            if not url or url in batch_urls:
+                continue
+            batch_urls.add(url)
+            if not seen_urls.contains(url):
+                candidates.append(news)
         
+        # 其他进程写入的新闻不在本进程的集合中，以数据库为准
+        known = find_known_urls([news['url'] for news in candidates])
+        if known:
+            seen_urls.add(known)
+        return [news for news in candidates if news['url'] not in known]
+    
+    def parse_list(self, name, response):
+        """按 SOURCES 配置解析列表页，返回新闻列表"""
+        with metrics.PARSE_SECONDS.labels(name, 'list').time():
+            text = parsing.decode_html(
+                response.content, response.headers.get('Content-Type'), self.charset_key(name, response), name
+            )
+            news_list = parsing.run(parsing.parse_list_page, SOURCES[name], name, text)
+        for news in news_list:
+            news['url'] = canonicalize_url(news['url'])
         return news_list
     
+    def parse_detail(self, name, response):
+        """按 SOURCES 配置边读取边解析详情页正文，耗时包含读取响应体"""
+        with metrics.PARSE_SECONDS.labels(name, 'detail').time():
+            return parsing.extract_detail(
+                SOURCES[name], response.iter_content(parsing.DETAIL_CHUNK_SIZE),
+                response.headers.get('Content-Type'), self.charset_key(name, response), name
+            )
+    
+    def charset_key(self, name, response):
+        """按主机缓存页面编码，没有URL时（如基准测试构造的响应）按来源缓存"""
+        return urlsplit(response.url or '').hostname or name
+    
+    def crawl_dongfangcaifu(self):
+        """爬取东方财富网"""
+        return self.crawl_source('东方财富网')
+    
+    def crawl_sina_finance(self):
+        """爬取新浪财经"""
+        return self.crawl_source('新浪财经')
+    
+    def crawl_caijing(self):
+        """爬取财经网"""
+        return self.crawl_source('财经网')
+    
     def crawl_jiemian(self):
         """爬取界面新闻财经板块"""
-        news_list = []
+        return self.crawl_source('界面新闻')
+    
+    def source_methods(self):
+        """返回 (新闻源名称, 爬取方法) 列表"""
+        return [
+            ('东方财富网', self.crawl_dongfangcaifu),
+            ('新浪财经', self.crawl_sina_finance),
+            ('财经网', self.crawl_caijing),
+            ('界面新闻', self.crawl_jiemian)
+        ]
+    
+    def crawl_all_sources(self, mode=None, on_progress=None, sources=None):
+        """爬取所有财经网站
+        
+        on_progress(来源, 状态, 条数) 在每个网站开始和结束爬取时调用，
+        状态为 running / done / failed。sources 为来源名称列表，只爬取这些来源。
+        """
+        mode = mode or CRAWL_MODE
+        source_methods = [
+            (name, func) for name, func in self.source_methods()
+            if sources is None or name in sources
+        ]
+        run = lambda source: self._run_source(source[0], source[1], on_progress)
+        
+        if mode == 'sequential':
+            results = [run(source) for source in source_methods]
+        else:
+            # 并发爬取各网站，对单个网站的请求由 DomainLimiter 限流
+            with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as executor:
+                results = list(executor.map(run, source_methods))
+        
+        # 按来源顺序合并结果，与依次爬取时保持一致
+        all_news = []
+        for news in results:
+            all_news.extend(news)
+        
+        return all_news
+    
+    def _run_source(self, name, source_func, on_progress=None):
+        """执行单个网站的爬取，失败时返回空列表"""
+        if on_progress:
+            on_progress(name, 'running', 0)
+        self.errors.pop(name, None)
         try:
-            url = "https://www.jiemian.com/lists/48.html"
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 解析新闻列表
-            articles = soup.find_all('div', class_='news-el')
-            for article in articles[:10]:
-                link_tag = article.find('a')
-                if link_tag:
-                    title = link_tag.text.strip()
-                    url = link_tag.get('href')
-                    if url and not url.startswith('http'):
-                        url = urljoin('https://www.jiemian.com/', url)
-                    
-                    news_list.append({
-                        'title': title,
-                        'content': '界面新闻财经报道',
-                        'source': '界面新闻',
-                        'url': url,
-                        'published_at': datetime.now().isoformat()
-                    })
+            news = source_func()
         except Exception as e:
-            logger.error(f"爬取界面新闻失败: {e}")
+            logger.error(f"爬取{name}失败: {e}")
+            self.errors[name] = str(e)
+            news = []
+        if name in self.errors:
+            metrics.CRAWL_FAILURES.labels(name).inc()
+        if on_progress:
+            on_progress(name, 'failed' if name in self.errors else 'done', len(news))
+        return news
+
+# 爬取结果写入
+def normalize_news(news_list):
+    """清洗爬取结果，返回 (有效新闻列表, 无效条数, 批内重复条数)"""
+    items = []
+    seen_keys = set()
+    invalid = 0
+    duplicates = 0
+    for news in news_list:
+        title = (news.get('title') or '').strip()
+        url = canonicalize_url((news.get('url') or '').strip())
+        source = (news.get('source') or '').strip()
+        if not title or not url or not source:
+            invalid += 1
+            continue
+        key = url_key(url)
+        if key in seen_keys:
+            duplicates += 1
+            continue
+        seen_keys.add(key)
+        items.append((title, (news.get('content') or '').strip(), source, url, news.get('published_at'), key))
+    return items, invalid, duplicates
+
+def write_news(conn, news_list):
+    """在一个事务中批量写入新闻，返回写入统计"""
+    items, invalid, duplicates = normalize_news(news_list)
+    
+    # 按来源分组写入，以便统计各来源新增条数
+    by_source = {}
+    for item in items:
+        by_source.setdefault(item[2], []).append(item)
+    
+    inserted_by_source = {}
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM news")
+        last_id = cursor.fetchone()[0]
+        for source, source_items in by_source.items():
+            inserted = 0
+            for i in range(0, len(source_items), INGEST_BATCH_SIZE):
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO news (title, content, source, url, published_at, url_key)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', source_items[i:i + INGEST_BATCH_SIZE])
+                inserted += cursor.rowcount
+            inserted_by_source[source] = inserted
+        if sum(inserted_by_source.values()):
+            # 新写入的新闻归入近似重复分组
+            cursor.execute(
+                "SELECT id, title FROM news WHERE id > ? ORDER BY id",
+                (last_id,)
+            )
+            assign_clusters(cursor, cursor.fetchall())
+            bump_data_generation(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    
+    seen_urls.add(item[3] for item in items)
+    if sum(inserted_by_source.values()):
+        news_broadcaster.notify()
+    inserted = sum(inserted_by_source.values())
+    return {
+        'inserted': inserted,
+        'duplicates': duplicates + len(items) - inserted,
+        'invalid': invalid,
+        'total': len(news_list),
+        'by_source': inserted_by_source
+    }
+
+# 写入线程：爬取线程只提交结果，由单一线程持有写锁批量写入
+class IngestWriter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+
+    def _ensure_started(self):
+        with self._lock:
+            # fork 出的子进程需要重新启动写入线程
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), daemon=True).start()
+            return self._queue
+
+    def submit(self, news_list):
+        """提交一批爬取结果，返回结果为写入统计的 Future"""
+        future = Future()
+        self._ensure_started().put((news_list, future))
+        return future
+
+    def _run(self, tasks):
+        while True:
+            news_list, future = tasks.get()
+            try:
+                with storage.connection() as conn, metrics.INGEST_SECONDS.time():
+                    result = write_news(conn, news_list)
+                for source, inserted in result['by_source'].items():
+                    metrics.CRAWL_ITEMS.labels(source, 'inserted').inc(inserted)
+                future.set_result(result)
+            except Exception as e:
+                logger.error(f"写入新闻失败: {e}")
+                future.set_exception(e)
+
+ingest_writer = IngestWriter()
+
+def ingest_news(news_list):
+    """写入爬取结果并等待完成，返回写入统计"""
+    return ingest_writer.submit(news_list).result()
+
+# 新闻推送：每个进程一个轮询线程，按 id 读取新写入的新闻并分发给本进程的 SSE 订阅者。
+# 本进程写入后立即唤醒轮询，其他进程写入的新闻在 STREAM_POLL_INTERVAL 秒内送达
+class StreamSubscriber:
+    def __init__(self, source=''):
+        self.source = source
+        self.buffer = deque()
+        self.overflowed = False
+        self.ready = threading.Event()
+
+    def put(self, news):
+        """缓冲一条新闻，缓冲区已满时丢弃并标记溢出"""
+        if self.source and news['source'] != self.source:
+            return
+        if len(self.buffer) >= STREAM_BUFFER_SIZE:
+            self.overflowed = True
+        else:
+            self.buffer.append(news)
+        self.ready.set()
+
+    def get(self, timeout):
+        """等待新的新闻，超时返回空列表"""
+        self.ready.wait(timeout)
+        self.ready.clear()
+        items = []
+        while self.buffer:
+            items.append(self.buffer.popleft())
+        return items
+
+class NewsBroadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._wakeup = threading.Event()
+        self._last_id = 0
+        self._pid = None
+
+    def subscribe(self, source=''):
+        """订阅新写入的新闻，本进程的订阅者已达 STREAM_MAX_CLIENTS 时返回 None"""
+        subscriber = StreamSubscriber(source)
+        with self._lock:
+            # fork 出的子进程需要重新启动轮询线程
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._subscribers = set()
+                self._wakeup = threading.Event()
+                threading.Thread(target=self._run, daemon=True).start()
+            if len(self._subscribers) >= STREAM_MAX_CLIENTS:
+                return None
+            if not self._subscribers:
+                # 没有订阅者时不轮询，从当前最新一条开始
+                with storage.connection() as conn:
+                    self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM news").fetchone()[0]
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def notify(self):
+        """本进程写入新闻后调用，立即唤醒轮询线程"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(STREAM_POLL_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self._poll()
+            except Exception as e:
+                logger.error(f"读取新写入的新闻失败: {e}")
+
+    def _poll(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            last_id = self._last_id
+        if not subscribers:
+            return
         
-        return news_list
+        while True:
+            with storage.connection() as conn:
+                rows = conn.execute(
+                    "SELECT * FROM news WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, INGEST_BATCH_SIZE)
+                ).fetchall()
+            for row in rows:
+                news = row_to_news(row)
+                for subscriber in subscribers:
+                    subscriber.put(news)
+            if rows:
+                last_id = rows[-1][0]
+            if len(rows) < INGEST_BATCH_SIZE:
+                break
+        
+        with self._lock:
+            self._last_id = max(self._last_id, last_id)
+
+news_broadcaster = NewsBroadcaster()
+
+def format_timestamp(dt):
+    """格式化为与 CURRENT_TIMESTAMP 一致的 UTC 时间字符串"""
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+# 手动爬取任务：在后台线程执行，同一时间只运行一个任务。执行中的任务定期更新 updated_at，
+# 超过 CRAWL_JOB_STALE_SECONDS 未更新的任务所在进程已退出，视为已中断（abandoned）
+CRAWL_JOB_ABANDONED_ERROR = '任务长时间未更新进度，执行任务的进程可能已退出'
+
+def crawl_job_stale_before():
+    """updated_at 早于该时间（SQLite datetime 修饰符）的执行中任务视为已中断"""
+    return f'-{CRAWL_JOB_STALE_SECONDS} seconds'
+
+def start_crawl_job():
+    """启动手动爬取任务，已有任务进行中时直接返回该任务
     
-    def crawl_all_sources(self):
-        """爬取所有财经网站"""
-        all_news = []
+    返回 (任务ID, 是否新建)。
+    """
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        # 加写锁后再检查，避免多个 worker 同时创建任务
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute('''
+            SELECT id FROM crawl_jobs
+            WHERE status = 'running' AND updated_at > datetime('now', ?)
+            ORDER BY started_at DESC LIMIT 1
+        ''', (crawl_job_stale_before(),))
+        row = cursor.fetchone()
+        if row:
+            conn.commit()
+            return row[0], False
         
-        # 依次爬取各网站
-        sources = [
-            self.crawl_dongfangcaifu,
-            self.crawl_sina_finance,
-            self.crawl_caijing,
-            self.crawl_jiemian
-        ]
+        # 新任务取代已中断的任务，将其状态落库
+        cursor.execute('''
+            UPDATE crawl_jobs SET status = 'abandoned', error = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND updated_at <= datetime('now', ?)
+        ''', (CRAWL_JOB_ABANDONED_ERROR, crawl_job_stale_before()))
         
-        for source_func in sources:
+        job_id = uuid.uuid4().hex
+        cursor.execute(
+            "INSERT INTO crawl_jobs (id, status, progress) VALUES (?, 'running', '{}')",
+            (job_id,)
+        )
+        conn.commit()
+    
+    threading.Thread(target=run_crawl_job, args=(job_id,), daemon=True).start()
+    return job_id, True
+
+def run_crawl_job(job_id):
+    """执行手动爬取任务，并将各来源进度写入 crawl_jobs"""
+    progress = {}
+    lock = threading.Lock()
+    
+    def update(**fields):
+        assignments = ''.join(f", {name} = ?" for name in fields)
+        with storage.connection() as conn:
+            conn.execute(
+                f"UPDATE crawl_jobs SET updated_at = CURRENT_TIMESTAMP{assignments} WHERE id = ?",
+                list(fields.values()) + [job_id]
+            )
+            conn.commit()
+    
+    def on_progress(source, status, found):
+        with lock:
+            progress[source] = {'status': status, 'found': found}
+            update(progress=json.dumps(progress, ensure_ascii=False))
+    
+    def heartbeat():
+        # 单个来源爬取较久时没有进度更新，定期刷新 updated_at，避免被当作已中断
+        while not finished.wait(max(1, CRAWL_JOB_STALE_SECONDS / 3)):
             try:
-                news = source_func()
-                all_news.extend(news)
-                time.sleep(1)  # 避免请求过于频繁
+                update()
             except Exception as e:
-                logger.error(f"爬取某个网站失败: {e}")
-                continue
+                logger.warning(f"更新手动爬取任务失败: {e}")
+    
+    finished = threading.Event()
+    threading.Thread(target=heartbeat, daemon=True).start()
+    try:
+        crawler = FinanceNewsCrawler()
+        for source, _ in crawler.source_methods():
+            progress[source] = {'status': 'pending', 'found': 0}
+        update(progress=json.dumps(progress, ensure_ascii=False))
         
-        return all_news
+        news_list = crawler.crawl_all_sources(on_progress=on_progress)
+        result = ingest_news(news_list)
+        crawler.save_list_cache()
+        with lock:
+            for source, info in progress.items():
+                info['added'] = result['by_source'].get(source, 0)
+            update(
+                status='done',
+                progress=json.dumps(progress, ensure_ascii=False),
+                total_crawled=len(news_list),
+                added=result['inserted'],
+                duplicates=result['duplicates'],
+                finished_at=format_timestamp(datetime.utcnow())
+            )
+        logger.info(f"手动爬取完成，新增 {result['inserted']} 条新闻")
+    except Exception as e:
+        logger.error(f"手动爬取任务失败: {e}")
+        update(status='failed', error=str(e), finished_at=format_timestamp(datetime.utcnow()))
+    finally:
+        finished.set()
+
+def get_crawl_job(job_id):
+    """查询手动爬取任务，不存在时返回None
+    
+    长时间未更新的执行中任务返回 abandoned 状态。
+    """
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, status, progress, total_crawled, added, duplicates, error,
+                   started_at, updated_at, finished_at,
+                   status = 'running' AND updated_at <= datetime('now', ?)
+            FROM crawl_jobs WHERE id = ?
+        ''', (crawl_job_stale_before(), job_id))
+        row = cursor.fetchone()
+    
+    if not row:
+        return None
+    stale = bool(row[10])
+    return {
+        'job_id': row[0],
+        'status': 'abandoned' if stale else row[1],
+        'progress': json.loads(row[2] or '{}'),
+        'total_crawled': row[3],
+        'added': row[4],
+        'duplicates': row[5],
+        'error': CRAWL_JOB_ABANDONED_ERROR if stale else row[6],
+        'started_at': row[7],
+        'updated_at': row[8],
+        'finished_at': row[9]
+    }
+
+# 自适应调度：每个来源按各自的间隔爬取，间隔随新增条数调整，失败时退避
+def ensure_schedule(sources):
+    """为尚无调度记录的来源创建记录，立即执行首次爬取"""
+    now = format_timestamp(datetime.utcnow())
+    with storage.connection() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO crawl_schedule (source, interval_seconds, next_run) VALUES (?, ?, ?)",
+            [(source, SCHEDULE_DEFAULT_INTERVAL, now) for source in sources]
+        )
+        conn.commit()
+
+def get_schedule():
+    """读取各来源的调度状态"""
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT source, interval_seconds, next_run, last_run, last_found, last_added,
+                   error_count, last_error
+            FROM crawl_schedule ORDER BY next_run
+        ''')
+        rows = cursor.fetchall()
+    return [{
+        'source': row[0],
+        'interval_seconds': row[1],
+        'next_run': row[2],
+        'last_run': row[3],
+        'last_found': row[4],
+        'last_added': row[5],
+        'error_count': row[6],
+        'last_error': row[7]
+    } for row in rows]
+
+def next_schedule(entry, added, error=None):
+    """根据本次爬取结果计算新的间隔和下次爬取时间，返回 (间隔, 下次时间, 连续失败次数)"""
+    interval = entry['interval_seconds']
+    if error:
+        # 失败时按连续失败次数指数退避，间隔本身保持不变
+        error_count = entry['error_count'] + 1
+        delay = min(SCHEDULE_MAX_INTERVAL, interval * 2 ** min(error_count, 10))
+    else:
+        error_count = 0
+        if added >= SCHEDULE_BUSY_THRESHOLD:
+            interval = max(SCHEDULE_MIN_INTERVAL, interval / 2)
+        elif added == 0:
+            interval = min(SCHEDULE_MAX_INTERVAL, interval * 1.5)
+        delay = interval
+    
+    delay *= random.uniform(1 - SCHEDULE_JITTER, 1 + SCHEDULE_JITTER)
+    next_run = datetime.utcnow() + timedelta(seconds=delay)
+    return interval, next_run, error_count
+
+def crawl_due_sources(crawler, schedule):
+    """爬取已到时间的来源并更新其调度记录"""
+    now = format_timestamp(datetime.utcnow())
+    due = [entry['source'] for entry in schedule if entry['next_run'] <= now]
+    if not due:
+        return
+    
+    logger.info(f"开始爬取财经新闻: {', '.join(due)}")
+    found = {}
+    news_list = crawler.crawl_all_sources(
+        sources=due,
+        on_progress=lambda source, status, count: found.__setitem__(source, count)
+    )
+    
+    errors = {source: crawler.errors[source] for source in due if source in crawler.errors}
+    try:
+        result = ingest_news(news_list)
+        crawler.save_list_cache(due)
+        added = result['by_source']
+        logger.info(f"爬取完成，新增 {result['inserted']} 条新闻，重复 {result['duplicates']} 条")
+    except Exception as e:
+        logger.error(f"保存爬取结果失败: {e}")
+        added = {}
+        errors.update({source: f"保存失败: {e}" for source in due})
+    
+    entries = {entry['source']: entry for entry in schedule}
+    with storage.connection() as conn:
+        for source in due:
+            interval, next_run, error_count = next_schedule(
+                entries[source], added.get(source, 0), errors.get(source)
+            )
+            conn.execute('''
+                UPDATE crawl_schedule
+                SET interval_seconds = ?, next_run = ?, last_run = ?, last_found = ?,
+                    last_added = ?, error_count = ?, last_error = ?
+                WHERE source = ?
+            ''', (
+                interval, format_timestamp(next_run), now, found.get(source, 0),
+                added.get(source, 0), error_count, errors.get(source), source
+            ))
+        conn.commit()
 
 # 定时爬取任务
 def scheduled_crawling():
     crawler = FinanceNewsCrawler()
+    sources = [name for name, _ in crawler.source_methods()]
+    ensure_schedule(sources)
     while True:
-        logger.info("开始爬取财经新闻...")
-        news_list = crawler.crawl_all_sources()
-        
-        # 存储到数据库
-        conn = sqlite3.connect('finance_news.db')
-        cursor = conn.cursor()
+        schedule = [entry for entry in get_schedule() if entry['source'] in sources]
+        try:
+            crawl_due_sources(crawler, schedule)
+        except Exception as e:
+            logger.error(f"定时爬取失败: {e}")
         
-        added_count = 0
-        for news in news_list:
+        # 休眠到最近一个来源的下次爬取时间，最长一分钟
+        next_run = min((entry['next_run'] for entry in get_schedule() if entry['source'] in sources), default=None)
+        delay = 60
+        if next_run:
+            seconds = (datetime.strptime(next_run, '%Y-%m-%d %H:%M:%S') - datetime.utcnow()).total_seconds()
+            delay = min(60, max(1, seconds))
+        time.sleep(delay)
+
+# 调度主进程选举：多个 worker 中只有持有文件锁的进程执行定时爬取，
+# 该进程退出后锁自动释放，由其他 worker 接管
+def acquire_scheduler_lock():
+    """尝试获取调度锁，成功时返回锁文件对象（需保持打开），否则返回None"""
+    if fcntl is None:
+        logger.warning("当前平台不支持 fcntl，本进程直接执行定时爬取")
+        return True
+    lock_file = open(SCHEDULER_LOCK_FILE, 'a+')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return lock_file
+
+def run_scheduler_election():
+    """循环参与选举，当选后执行定时爬取"""
+    while True:
+        lock = acquire_scheduler_lock()
+        if lock:
+            logger.info(f"进程 {os.getpid()} 成为定时爬取主进程")
             try:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO news (title, content, source, url, published_at)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (news['title'], news['content'], news['source'], news['url'], news['published_at']))
-                if cursor.rowcount > 0:
-                    added_count += 1
-            except sqlite3.IntegrityError:
-                continue  # URL重复，跳过
-        
-        conn.commit()
-        conn.close()
-        logger.info(f"爬取完成，新增 {added_count} 条新闻")
-        
-        # 每小时爬取一次
-        time.sleep(3600)
+                scheduled_crawling()
+            finally:
+                if lock is not True:
+                    lock.close()
+        time.sleep(SCHEDULER_ELECTION_INTERVAL)
 
 # 启动定时任务
+_scheduler_started = False
+_scheduler_lock = threading.Lock()
+
 def start_scheduler():
-    scheduler_thread = threading.Thread(target=scheduled_crawling, daemon=True)
+    global _scheduler_started
+    with _scheduler_lock:
+        if _scheduler_started:
+            return
+        _scheduler_started = True
+    scheduler_thread = threading.Thread(target=run_scheduler_election, daemon=True)
     scheduler_thread.start()
     logger.info("定时爬取任务已启动")
 
+def bootstrap():
+    """进程启动时调用：初始化数据库并参与调度主进程选举"""
+    init_db()
+    if RUN_SCHEDULER:
+        start_scheduler()
+
+# 响应压缩：按 Accept-Encoding 协商 br / gzip，brotli 未安装时只使用 gzip
+COMPRESS_ENCODINGS = ['br', 'gzip'] if brotli else ['gzip']
+COMPRESS_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv',
+    'application/javascript', 'application/json', 'application/x-ndjson'
+}
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(COMPRESS_LEVEL, 11))
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+
+def compress_stream(chunks, encoding):
+    """逐块压缩流式响应，每块压缩后立即发送"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(COMPRESS_LEVEL, 11))
+        for chunk in chunks:
+            data = compressor.process(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            data += compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+# 已压缩响应的缓存，避免对同一 ETag 的响应重复压缩
+compressed_cache = OrderedDict()
+compressed_cache_lock = threading.Lock()
+
+# 接口耗时
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.REQUEST_SECONDS.labels(route, request.method, response.status_code).observe(
+            time.perf_counter() - start
+        )
+    return response
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(COMPRESS_ENCODINGS)
+    if not encoding:
+        return response
+    
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        
+        etag, _ = response.get_etag()
+        key = (etag, encoding)
+        with compressed_cache_lock:
+            compressed = compressed_cache.get(key) if etag else None
+        if compressed is None:
+            compressed = compress_body(body, encoding)
+            if etag:
+                with compressed_cache_lock:
+                    compressed_cache[key] = compressed
+                    while len(compressed_cache) > RESPONSE_CACHE_SIZE:
+                        compressed_cache.popitem(last=False)
+        response.set_data(compressed)
+        if etag:
+            response.set_etag(f"{etag}-{encoding}")
+    
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# 读接口响应缓存：按路由和查询参数缓存，数据代数变化后失效
+class ResponseCache:
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, generation):
+        """读取缓存，不存在或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['generation'] != generation:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+response_cache = ResponseCache()
+
+def cached_response(view):
+    """为只读接口添加响应缓存和 ETag，内容未变化时返回304"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        generation = get_data_generation()
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        
+        entry = response_cache.get(key, generation)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            entry = {
+                'generation': generation,
+                'body': body,
+                'content_type': response.headers.get('Content-Type'),
+                'etag': hashlib.sha1(body).hexdigest()
+            }
+            response_cache.put(key, entry)
+        
+        # 压缩后的响应 ETag 带有编码后缀，同样视为命中
+        for etag in [entry['etag']] + [f"{entry['etag']}-{encoding}" for encoding in COMPRESS_ENCODINGS]:
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+        
+        response = app.response_class(entry['body'], content_type=entry['content_type'])
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
 # Web界面
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -438,6 +1855,16 @@ HTML_TEMPLATE = '''
             min-width: 40px;
         }
         
+        .pagination button:disabled {
+            background-color: #bdc3c7;
+            cursor: default;
+        }
+        
+        .page-indicator {
+            align-self: center;
+            color: #7f8c8d;
+        }
+        
         .loading {
             text-align: center;
             padding: 2rem;
@@ -484,11 +1911,12 @@ HTML_TEMPLATE = '''
             
             <div class="control-group">
                 <label>&nbsp;</label>
-                <button onclick="loadNews()">搜索</button>
+                <button onclick="applyFilters()">搜索</button>
             </div>
             
-            <div style="margin-left: auto; display: flex; align-items: flex-end;">
-                <button onclick="manualCrawl()" style="background-color: #27ae60;">手动更新</button>
+            <div style="margin-left: auto; display: flex; align-items: flex-end; gap: 10px;">
+                <button id="liveButton" onclick="toggleLive()">实时推送：关</button>
+                <button id="crawlButton" onclick="manualCrawl()" style="background-color: #27ae60;">手动更新</button>
             </div>
         </div>
         
@@ -530,41 +1958,54 @@ HTML_TEMPLATE = '''
         </div>
         
         <div class="pagination" id="pagination">
-            {% for i in range(1, pages + 1) %}
-            <button onclick="loadPage({{ i }})" {% if i == page %}style="background-color: #2c3e50;"{% endif %}>{{ i }}</button>
-            {% endfor %}
+            <button onclick="loadPage({{ page - 1 }})" {% if page <= 1 %}disabled{% endif %}>上一页</button>
+            <span class="page-indicator">第 {{ page }} 页</span>
+            <button onclick="loadPage({{ page + 1 }})" {% if not next_cursor %}disabled{% endif %}>下一页</button>
         </div>
     </div>
     
     <script>
         let currentPage = {{ page }};
-        let totalPages = {{ pages }};
         let currentSource = '';
         let currentSearch = '';
+        // 每一页的起始游标，第1页为空字符串；未知游标的页按 page 参数加载
+        let pageCursors = {1: ''};
+        {% if next_cursor %}pageCursors[{{ page + 1 }}] = {{ next_cursor|tojson }};{% endif %}
         
         function loadNews() {
             currentSource = document.getElementById('sourceFilter').value;
             currentSearch = document.getElementById('searchInput').value;
             
-            const url = `/api/news?page=${currentPage}&limit=20&source=${encodeURIComponent(currentSource)}&search=${encodeURIComponent(currentSearch)}`;
+            let url = `/api/news?limit=20&source=${encodeURIComponent(currentSource)}&search=${encodeURIComponent(currentSearch)}`;
+            const cursor = pageCursors[currentPage];
+            if (cursor !== undefined) {
+                url += `&cursor=${encodeURIComponent(cursor)}`;
+            } else {
+                url += `&page=${currentPage}`;
+            }
             
             fetch(url)
                 .then(response => response.json())
                 .then(data => {
+                    if (data.next_cursor) {
+                        pageCursors[currentPage + 1] = data.next_cursor;
+                    }
                     renderNews(data.data);
-                    renderPagination(data.page, data.pages);
+                    renderPagination(currentPage, data.next_cursor);
                 })
                 .catch(error => {
                     console.error('Error:', error);
                 });
         }
         
-        function renderNews(newsList) {
-            const container = document.getElementById('newsContainer');
-            let html = '<div class="news-grid">';
-            
-            newsList.forEach(news => {
-                html += `
+        function applyFilters() {
+            currentPage = 1;
+            pageCursors = {1: ''};
+            loadNews();
+        }
+        
+        function newsCardHtml(news) {
+            return `
                     <div class="news-card" data-source="${news.source}">
                         <div class="news-header">
                             <span class="news-source">${news.source}</span>
@@ -577,22 +2018,87 @@ HTML_TEMPLATE = '''
                         </div>
                     </div>
                 `;
+        }
+        
+        function renderNews(newsList) {
+            const container = document.getElementById('newsContainer');
+            let html = '<div class="news-grid">';
+            
+            newsList.forEach(news => {
+                html += newsCardHtml(news);
             });
             
             html += '</div>';
             container.innerHTML = html;
         }
         
-        function renderPagination(page, totalPages) {
-            const pagination = document.getElementById('pagination');
-            let html = '';
-            
-            for (let i = 1; i <= totalPages; i++) {
-                const activeStyle = i === page ? 'background-color: #2c3e50;' : '';
-                html += `<button onclick="loadPage(${i})" style="${activeStyle}">${i}</button>`;
+        // 实时推送：点击按钮后才订阅新写入的新闻，停留在第1页且未搜索时插入到列表顶部。
+        // 每个连接占用服务端一个线程，因此不在页面加载时自动订阅
+        let liveSource = null;
+        let liveRetryTimer = null;
+        
+        function toggleLive() {
+            if (liveSource || liveRetryTimer) {
+                stopLive();
+            } else {
+                subscribeNews();
             }
-            
-            pagination.innerHTML = html;
+        }
+        
+        function stopLive() {
+            if (liveSource) {
+                liveSource.close();
+                liveSource = null;
+            }
+            clearTimeout(liveRetryTimer);
+            liveRetryTimer = null;
+            document.getElementById('liveButton').textContent = '实时推送：关';
+        }
+        
+        function subscribeNews() {
+            if (!window.EventSource) {
+                alert('浏览器不支持实时推送');
+                return;
+            }
+            liveRetryTimer = null;
+            document.getElementById('liveButton').textContent = '实时推送：开';
+            const source = new EventSource('/api/stream');
+            liveSource = source;
+            source.addEventListener('error', () => {
+                // 服务端连接数已满（503）时浏览器不会自动重连，稍后重新订阅
+                if (source.readyState === EventSource.CLOSED && liveSource === source) {
+                    liveSource = null;
+                    document.getElementById('liveButton').textContent = '实时推送：等待';
+                    liveRetryTimer = setTimeout(subscribeNews, 30000);
+                }
+            });
+            source.addEventListener('reset', () => {
+                // 断线期间错过的新闻过多，只补发了最新的部分，重新加载列表
+                if (currentPage === 1) {
+                    applyFilters();
+                }
+            });
+            source.addEventListener('news', event => {
+                const news = JSON.parse(event.data);
+                const totalNews = document.getElementById('totalNews');
+                totalNews.textContent = parseInt(totalNews.textContent || '0') + 1;
+                if (currentPage !== 1 || currentSearch || (currentSource && news.source !== currentSource)) {
+                    return;
+                }
+                const grid = document.querySelector('#newsContainer .news-grid');
+                if (grid) {
+                    grid.insertAdjacentHTML('afterbegin', newsCardHtml(news));
+                }
+            });
+        }
+        
+        function renderPagination(page, nextCursor) {
+            const pagination = document.getElementById('pagination');
+            pagination.innerHTML = `
+                <button onclick="loadPage(${page - 1})" ${page <= 1 ? 'disabled' : ''}>上一页</button>
+                <span class="page-indicator">第 ${page} 页</span>
+                <button onclick="loadPage(${page + 1})" ${nextCursor ? '' : 'disabled'}>下一页</button>
+            `;
         }
         
         function loadPage(page) {
@@ -601,25 +2107,49 @@ HTML_TEMPLATE = '''
         }
         
         function manualCrawl() {
+            const button = document.getElementById('crawlButton');
+            button.disabled = true;
+            
             fetch('/api/crawl', {
                 method: 'POST'
             })
             .then(response => response.json())
-            .then(data => {
-                alert(data.message);
-                loadNews();
-            })
+            .then(data => pollCrawlJob(data.job_id))
             .catch(error => {
                 console.error('Error:', error);
                 alert('手动更新失败');
+                button.disabled = false;
             });
         }
         
+        function pollCrawlJob(jobId) {
+            const button = document.getElementById('crawlButton');
+            
+            fetch(`/api/crawl/${jobId}`)
+                .then(response => response.json())
+                .then(job => {
+                    if (job.status === 'running') {
+                        button.textContent = job.message;
+                        setTimeout(() => pollCrawlJob(jobId), 2000);
+                        return;
+                    }
+                    button.textContent = '手动更新';
+                    button.disabled = false;
+                    alert(job.message);
+                    loadNews();
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    button.textContent = '手动更新';
+                    button.disabled = false;
+                    alert('手动更新失败');
+                });
+        }
+        
         // 绑定搜索输入事件
         document.getElementById('searchInput').addEventListener('keyup', function(event) {
             if (event.key === 'Enter') {
-                currentPage = 1;
-                loadNews();
+                applyFilters();
             }
         });
     </script>
@@ -627,185 +2157,247 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
-@app.route('/')
-def index():
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 20))
-    source = request.args.get('source', '')
-    search = request.args.get('search', '')
-    
-    conn = sqlite3.connect('finance_news.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT * FROM news WHERE 1=1"
+# 启动时编译一次首页模板，避免每次请求重新解析
+INDEX_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+
+def row_to_news(row):
+    """将 news 表的一行转换为字典"""
+    return {
+        'id': row[0],
+        'title': row[1],
+        'content': row[2],
+        'source': row[3],
+        'url': row[4],
+        'published_at': row[5],
+        'created_at': row[6],
+        'cluster_id': row[7]
+    }
+
+def encode_cursor(news):
+    """根据一条新闻的 (created_at, id) 生成分页游标"""
+    raw = json.dumps([news['created_at'], news['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(token):
+    """解析分页游标，返回 (created_at, id)，格式错误时抛出 ValueError"""
+    try:
+        created_at, news_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return str(created_at), int(news_id)
+    except Exception:
+        raise ValueError(f"无效的分页游标: {token}")
+
+def news_conditions(alias, source='', search='', fts_query=None):
+    """返回 alias 表按来源和搜索词筛选的条件（以 AND 开头）和参数，不含全文索引的 MATCH"""
+    conditions = ''
     params = []
-    
     if source:
-        query += " AND source = ?"
+        conditions += f" AND {alias}.source = ?"
         params.append(source)
     
-    if search:
-        query += " AND (title LIKE ? OR content LIKE ?)"
-        params.extend([f'%{search}%', f'%{search}%'])
+    # 单字符的词无法使用全文索引，逐个按 LIKE 匹配；没有可切分的词时按原文匹配
+    terms = like_terms(search) if search else []
+    if search and not fts_query and not terms:
+        terms = [search]
+    for term in terms:
+        conditions += f" AND ({alias}.title LIKE ? OR {alias}.content LIKE ?)"
+        params.extend([f'%{term}%', f'%{term}%'])
+    return conditions, params
+
+def build_news_filter(source='', search='', collapse=False):
+    """构建新闻查询的 FROM/WHERE 子句，返回 (子句, 参数, FTS查询)
     
-    query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-    offset = (page - 1) * limit
-    params.extend([limit, offset])
+    collapse 为真时每个近似重复分组只保留符合筛选条件的新闻中最早的一条。
+    """
+    fts_query = build_fts_query(search) if search else None
     
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
+    if fts_query:
+        where = "FROM news JOIN news_fts ON news_fts.rowid = news.id WHERE news_fts MATCH ?"
+        params = [fts_query]
+    else:
+        where = "FROM news WHERE 1=1"
+        params = []
     
-    news_list = []
-    for row in rows:
-        news_list.append({
-            'id': row[0],
-            'title': row[1],
-            'content': row[2],
-            'source': row[3],
-            'url': row[4],
-            'published_at': row[5],
-            'created_at': row[6]
-        })
+    conditions, condition_params = news_conditions('news', source, search, fts_query)
+    where += conditions
+    params.extend(condition_params)
     
-    # 获取总数
-    count_query = "SELECT COUNT(*) FROM news WHERE 1=1"
-    count_params = []
+    if collapse:
+        # 同组中有更早的一条也符合筛选条件时跳过，组内最早的一条不符合条件时由下一条代替。
+        # 每行只按 idx_news_cluster 查找同组更早的新闻，外层按时间倒序读取到够数即可停止
+        conditions, condition_params = news_conditions('earlier', source, search, fts_query)
+        if fts_query:
+            conditions += " AND earlier.id IN (SELECT rowid FROM news_fts WHERE news_fts MATCH ?)"
+            condition_params.append(fts_query)
+        where += f''' AND (news.cluster_id IS NULL OR NOT EXISTS (
+            SELECT 1 FROM news AS earlier
+            WHERE earlier.cluster_id = news.cluster_id
+              AND (earlier.created_at, earlier.id) < (news.created_at, news.id){conditions}
+        ))'''
+        params.extend(condition_params)
     
-    if source:
-        count_query += " AND source = ?"
-        count_params.append(source)
+    return where, params, fts_query
+
+def query_news(cursor, page, limit, source='', search='', sort='time', collapse=False):
+    """按条件分页查询新闻，返回 (新闻列表, 总数)
+    
+    sort 为 relevance 且使用全文索引时按 BM25 相关度排序，否则按时间倒序。
+    """
+    where, params, fts_query = build_news_filter(source, search, collapse)
     
-    if search:
-        count_query += " AND (title LIKE ? OR content LIKE ?)"
-        count_params.extend([f'%{search}%', f'%{search}%'])
+    if fts_query and sort == 'relevance':
+        order = "bm25(news_fts, 10.0, 1.0), news.created_at DESC, news.id DESC"
+    else:
+        order = "news.created_at DESC, news.id DESC"
     
-    cursor.execute(count_query, count_params)
+    query = f"SELECT news.* {where} ORDER BY {order} LIMIT ? OFFSET ?"
+    offset = (page - 1) * limit
+    cursor.execute(query, params + [limit, offset])
+    news_list = [row_to_news(row) for row in cursor.fetchall()]
+    
+    # 获取总数
+    cursor.execute(f"SELECT COUNT(*) {where}", params)
     total = cursor.fetchone()[0]
     
-    # 获取所有新闻源
-    cursor.execute("SELECT DISTINCT source FROM news ORDER BY source")
-    sources = [row[0] for row in cursor.fetchall()]
+    return news_list, total
+
+def query_news_after(cursor, limit, source='', search='', after=None, collapse=False):
+    """按 (created_at, id) 游标分页查询新闻，返回 (新闻列表, 下一页游标)
     
-    # 获取统计信息
-    cursor.execute("SELECT COUNT(*) FROM news")
-    total_news = cursor.fetchone()[0]
+    after 为上一页返回的游标，为空时从最新一条开始。不统计总数。
+    """
+    where, params, _ = build_news_filter(source, search, collapse)
     
-    cursor.execute("SELECT MAX(created_at) FROM news")
-    last_update = cursor.fetchone()[0]
+    if after:
+        where += " AND (news.created_at, news.id) < (?, ?)"
+        params.extend(decode_cursor(after))
     
-    conn.close()
+    # 多取一条用于判断是否还有下一页
+    query = f"SELECT news.* {where} ORDER BY news.created_at DESC, news.id DESC LIMIT ?"
+    cursor.execute(query, params + [limit + 1])
+    news_list = [row_to_news(row) for row in cursor.fetchall()]
     
-    pages = (total + limit - 1) // limit
+    next_cursor = None
+    if len(news_list) > limit:
+        news_list = news_list[:limit]
+        next_cursor = encode_cursor(news_list[-1])
+    
+    return news_list, next_cursor
+
+def page_args():
+    """读取分页参数，返回 (page, limit)，limit 超过 MAX_PAGE_LIMIT 时取该值；无效时抛出 ValueError"""
+    try:
+        page = int(request.args.get('page', 1))
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        raise ValueError("page 和 limit 必须为整数")
+    if page < 1 or limit < 1:
+        raise ValueError("page 和 limit 必须大于 0")
+    return page, min(limit, MAX_PAGE_LIMIT)
+
+@app.route('/')
+@cached_response
+def index():
+    try:
+        page, limit = page_args()
+    except ValueError as e:
+        return str(e), 400
+    source = request.args.get('source', '')
+    search = request.args.get('search', '')
+    sort = request.args.get('sort', 'time')
     
-    return render_template_string(
-        HTML_TEMPLATE,
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        
+        if page == 1 and sort != 'relevance':
+            news_list, next_cursor = query_news_after(cursor, limit, source, search)
+        else:
+            # 兼容 page 参数
+            news_list, total = query_news(cursor, page, limit, source, search, sort)
+            has_more = page < (total + limit - 1) // limit
+            next_cursor = encode_cursor(news_list[-1]) if has_more and sort != 'relevance' else None
+        
+        # 获取统计信息和所有新闻源
+        total_news, source_stats, last_update = get_stats_summary(cursor)
+        sources = sorted(item['source'] for item in source_stats)
+    
+    # 每页条数较多或传入 stream=1 时边渲染边发送
+    stream = request.args.get('stream') == '1' or limit > STREAM_THRESHOLD
+    render = stream_template if stream else render_template
+    return render(
+        INDEX_TEMPLATE,
         news_list=news_list,
         page=page,
-        pages=pages,
+        next_cursor=next_cursor,
         sources=sources,
         stats={
             'total_news': total_news,
+            'source_stats': source_stats,
             'last_update': last_update or 'N/A'
         }
     )
 
 @app.route('/api/news', methods=['GET'])
+@cached_response
 def get_news():
-    """获取新闻列表"""
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 20))
+    """获取新闻列表
+    
+    传入 cursor 参数（首页为空字符串）时使用游标分页并返回 next_cursor，
+    否则按 page 参数分页。传入 collapse=1 时近似重复的新闻只返回最早的一条。
+    """
+    try:
+        page, limit = page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     source = request.args.get('source', '')
     search = request.args.get('search', '')
+    sort = request.args.get('sort', 'time')
+    collapse = request.args.get('collapse') == '1'
     
-    conn = sqlite3.connect('finance_news.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT * FROM news WHERE 1=1"
-    params = []
-    
-    if source:
-        query += " AND source = ?"
-        params.append(source)
-    
-    if search:
-        query += " AND (title LIKE ? OR content LIKE ?)"
-        params.extend([f'%{search}%', f'%{search}%'])
-    
-    query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-    offset = (page - 1) * limit
-    params.extend([limit, offset])
-    
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    
-    news_list = []
-    for row in rows:
-        news_list.append({
-            'id': row[0],
-            'title': row[1],
-            'content': row[2],
-            'source': row[3],
-            'url': row[4],
-            'published_at': row[5],
-            'created_at': row[6]
-        })
-    
-    # 获取总数
-    count_query = "SELECT COUNT(*) FROM news WHERE 1=1"
-    count_params = []
-    
-    if source:
-        count_query += " AND source = ?"
-        count_params.append(source)
-    
-    if search:
-        count_query += " AND (title LIKE ? OR content LIKE ?)"
-        count_params.extend([f'%{search}%', f'%{search}%'])
-    
-    cursor.execute(count_query, count_params)
-    total = cursor.fetchone()[0]
-    
-    conn.close()
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        
+        if 'cursor' in request.args:
+            try:
+                news_list, next_cursor = query_news_after(
+                    cursor, limit, source, search, request.args.get('cursor'), collapse
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'data': news_list,
+                'next_cursor': next_cursor
+            })
+        
+        news_list, total = query_news(cursor, page, limit, source, search, sort, collapse)
     
+    pages = (total + limit - 1) // limit
     return jsonify({
         'data': news_list,
         'total': total,
         'page': page,
-        'pages': (total + limit - 1) // limit
+        'pages': pages,
+        'next_cursor': encode_cursor(news_list[-1]) if news_list and page < pages and sort != 'relevance' else None
     })
 
 @app.route('/api/sources', methods=['GET'])
+@cached_response
 def get_sources():
     """获取新闻源列表"""
-    conn = sqlite3.connect('finance_news.db')
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT DISTINCT source FROM news ORDER BY source")
-    sources = [row[0] for row in cursor.fetchall()]
-    
-    conn.close()
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT source FROM source_stats ORDER BY source")
+        sources = [row[0] for row in cursor.fetchall()]
     
     return jsonify({'sources': sources})
 
 @app.route('/api/stats', methods=['GET'])
+@cached_response
 def get_stats():
     """获取统计信息"""
-    conn = sqlite3.connect('finance_news.db')
-    cursor = conn.cursor()
-    
-    # 总新闻数
-    cursor.execute("SELECT COUNT(*) FROM news")
-    total_news = cursor.fetchone()[0]
-    
-    # 各来源新闻数
-    cursor.execute("SELECT source, COUNT(*) FROM news GROUP BY source ORDER BY COUNT(*) DESC")
-    source_stats = [{'source': row[0], 'count': row[1]} for row in cursor.fetchall()]
-    
-    # 最新更新时间
-    cursor.execute("SELECT MAX(created_at) FROM news")
-    last_update = cursor.fetchone()[0]
-    
-    conn.close()
+    with storage.connection() as conn:
+        total_news, source_stats, last_update = get_stats_summary(conn.cursor())
     
     return jsonify({
         'total_news': total_news,
@@ -815,35 +2407,228 @@ def get_stats():
 
 @app.route('/api/crawl', methods=['POST'])
 def manual_crawl():
-    """手动触发爬取"""
-    crawler = FinanceNewsCrawler()
-    news_list = crawler.crawl_all_sources()
+    """手动触发爬取，任务在后台执行，通过 /api/crawl/<job_id> 查询进度"""
+    job_id, created = start_crawl_job()
     
-    # 存储到数据库
-    conn = sqlite3.connect('finance_news.db')
-    cursor = conn.cursor()
+    return jsonify({
+        'message': '爬取任务已启动' if created else '已有爬取任务正在进行',
+        'job_id': job_id,
+        'status': 'running'
+    }), 202
+
+@app.route('/api/crawl/<job_id>', methods=['GET'])
+def get_crawl_status(job_id):
+    """查询手动爬取任务的进度和结果"""
+    job = get_crawl_job(job_id)
+    if job is None:
+        return jsonify({'error': '爬取任务不存在'}), 404
     
-    added_count = 0
-    for news in news_list:
-        try:
-            cursor.execute('''
-                INSERT OR IGNORE INTO news (title, content, source, url, published_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (news['title'], news['content'], news['source'], news['url'], news['published_at']))
-            if cursor.rowcount > 0:
-                added_count += 1
-        except sqlite3.IntegrityError:
-            continue
+    if job['status'] == 'done':
+        job['message'] = f'手动爬取完成，新增 {job["added"]} 条新闻'
+    elif job['status'] == 'failed':
+        job['message'] = '手动爬取失败'
+    elif job['status'] == 'abandoned':
+        job['message'] = '手动爬取已中断，请重新更新'
+    else:
+        finished = sum(1 for info in job['progress'].values() if info['status'] in ('done', 'failed'))
+        job['message'] = f'正在爬取（{finished}/{len(job["progress"])}）'
     
-    conn.commit()
-    conn.close()
+    return jsonify(job)
+
+EXPORT_FIELDS = ['id', 'title', 'content', 'source', 'url', 'published_at', 'created_at', 'cluster_id']
+
+def iter_news_rows(source='', since='', after_id=0):
+    """按 id 顺序逐批读取新闻，每批使用独立的短查询，内存占用与总量无关"""
+    while True:
+        query = f"SELECT {', '.join(EXPORT_FIELDS)} FROM news WHERE id > ?"
+        params = [after_id]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        if since:
+            query += " AND created_at >= ?"
+            params.append(since)
+        query += " ORDER BY id LIMIT ?"
+        params.append(EXPORT_BATCH_SIZE)
+        
+        with storage.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        after_id = rows[-1][0]
+
+def format_stream_event(news):
+    """将一条新闻格式化为 SSE 事件，事件 id 为新闻 id"""
+    data = json.dumps(news, ensure_ascii=False)
+    return f"id: {news['id']}\nevent: news\ndata: {data}\n\n"
+
+def replay_start(source, last_id):
+    """返回补发的起始 id：last_id 之后超过 STREAM_REPLAY_LIMIT 条时只补发最新的
+    STREAM_REPLAY_LIMIT 条，返回其前一条的 id；否则返回 None，从 last_id 之后全部补发"""
+    query = "SELECT id FROM news WHERE id > ?"
+    params = [last_id]
+    if source:
+        query += " AND source = ?"
+        params.append(source)
+    query += " ORDER BY id DESC LIMIT 1 OFFSET ?"
+    params.append(STREAM_REPLAY_LIMIT)
+    with storage.connection() as conn:
+        row = conn.execute(query, params).fetchone()
+    return row[0] if row else None
+
+@app.route('/api/stream', methods=['GET'])
+def stream_news():
+    """以 Server-Sent Events 推送新写入的新闻
+    
+    参数：source 按来源筛选。断线重连时浏览器自动发送 Last-Event-ID（也可传 last_id 参数），
+    先从数据库补发其后的新闻，最多 STREAM_REPLAY_LIMIT 条；错过的更多时先发送 reset 事件，
+    只补发最新的部分，客户端应重新加载列表。客户端读取过慢导致缓冲区溢出时断开连接，
+    由客户端重连补发。本进程的连接数已达 STREAM_MAX_CLIENTS 时返回 503。
+    """
+    source = request.args.get('source', '')
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': f'无效的 Last-Event-ID: {last_event_id}'}), 400
+    
+    # 先订阅再补发，补发期间写入的新闻留在缓冲区中，按 id 去重
+    subscriber = news_broadcaster.subscribe(source)
+    if subscriber is None:
+        logger.warning(f"推送连接数已达上限 {STREAM_MAX_CLIENTS}，拒绝新的连接")
+        response = app.response_class(
+            f"retry: {int(STREAM_BUSY_RETRY * 1000)}\n\n", status=503, mimetype='text/event-stream'
+        )
+        response.headers['Retry-After'] = str(int(STREAM_BUSY_RETRY))
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     
+    def generate():
+        yield "retry: 3000\n\n"
+        sent_id = last_id or 0
+        if last_id is not None:
+            start = replay_start(source, last_id)
+            if start is not None:
+                yield f"id: {start}\nevent: reset\ndata: {json.dumps({'last_id': start})}\n\n"
+                sent_id = start
+            for row in iter_news_rows(source, '', sent_id):
+                news = row_to_news(row)
+                yield format_stream_event(news)
+                sent_id = news['id']
+        
+        while True:
+            items = subscriber.get(STREAM_HEARTBEAT)
+            if not items and not subscriber.overflowed:
+                yield ": keepalive\n\n"
+                continue
+            for news in items:
+                if news['id'] > sent_id:
+                    yield format_stream_event(news)
+                    sent_id = news['id']
+            if subscriber.overflowed:
+                logger.warning(f"推送客户端读取过慢，断开连接，最后发送的新闻 id: {sent_id}")
+                return
+    
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    # 连接关闭时取消订阅，生成器尚未开始执行（客户端提前断开）时也会调用
+    response.call_on_close(lambda: news_broadcaster.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    # 关闭反向代理缓冲
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 指标，多进程运行时汇总所有 worker"""
+    body, content_type = metrics.render()
+    return app.response_class(body, content_type=content_type)
+
+def require_admin(view):
+    """管理接口需在 X-Admin-Token 或 Authorization: Bearer 头中提供 ADMIN_TOKEN"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': '管理接口未启用'}), 404
+        token = request.headers.get('X-Admin-Token', '')
+        authorization = request.headers.get('Authorization', '')
+        if not token and authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):].strip()
+        if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({'error': '未授权'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/admin/queries', methods=['GET', 'DELETE'])
+@require_admin
+def admin_queries():
+    """本进程耗时最多的语句形状（需开启 DB_PROFILE），DELETE 清空统计
+    
+    参数：limit 条数，sort 为 total（总耗时）、max（最长耗时）或 mean（平均耗时）。
+    """
+    if request.method == 'DELETE':
+        storage.profiler.reset()
+        return jsonify({'message': '语句分析统计已清空'})
+    
+    limit = int(request.args.get('limit', 20))
+    sort = request.args.get('sort', 'total')
     return jsonify({
-        'message': f'手动爬取完成，新增 {added_count} 条新闻',
-        'total_crawled': len(news_list)
+        'enabled': storage.DB_PROFILE,
+        'pid': os.getpid(),
+        'slow_query_ms': storage.DB_SLOW_QUERY_MS,
+        'queries': storage.profiler.top(limit, sort)
     })
 
+@app.route('/api/schedule', methods=['GET'])
+def get_crawl_schedule():
+    """获取各来源的爬取间隔和下次爬取时间（UTC）"""
+    return jsonify({'schedule': get_schedule()})
+
+@app.route('/api/export', methods=['GET'])
+def export_news():
+    """流式导出新闻，支持 NDJSON 和 CSV
+    
+    参数：format（ndjson / csv）、source、since（created_at 下限），
+    resume 为上次收到的最后一条新闻的 id，用于断点续传。
+    """
+    export_format = request.args.get('format', 'ndjson')
+    source = request.args.get('source', '')
+    since = request.args.get('since', '')
+    
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': f'不支持的导出格式: {export_format}'}), 400
+    try:
+        after_id = int(request.args.get('resume') or 0)
+    except ValueError:
+        return jsonify({'error': '无效的 resume 参数'}), 400
+    
+    rows = iter_news_rows(source, since, after_id)
+    
+    if export_format == 'csv':
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            # resume 续传时不重复输出表头
+            if not after_id:
+                writer.writerow(EXPORT_FIELDS)
+            for row in rows:
+                writer.writerow(row)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        mimetype = 'text/csv'
+    else:
+        def generate():
+            for row in rows:
+                yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n'
+        mimetype = 'application/x-ndjson'
+    
+    response = app.response_class(generate(), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=finance_news.{export_format}'
+    return response
+
 if __name__ == '__main__':
-    init_db()
-    start_scheduler()
+    bootstrap()
     app.run(host='0.0.0.0', port=PORT, debug=(FLASK_ENV == 'development'))
@@ -0,0 +1,206 @@
+"""爬虫离线基准测试
+
+用 fixtures 中的页面测试各来源列表页和详情页的解析吞吐量，并通过本地模拟网站
+测试一轮爬取（crawl_all_sources）在各爬取模式下的耗时和请求数，不访问真实网站，
+也不写入真实数据库。
+
+    python benchmarks/crawler_bench.py --latency 0.2 --rounds 3
+    python benchmarks/crawler_bench.py --error-rate 0.1 --json > result.json
+
+爬虫配置仍从环境变量读取。为了测出爬虫自身的开销，基准测试默认放宽同一主机的限速
+（HOST_RATE=20、HOST_BURST=5），可通过环境变量覆盖。
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import shutil
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import FixtureServer, load_fixture, mount
+
+# 各来源的列表页和详情页 fixture
+SOURCE_FIXTURES = {
+    '东方财富网': ('eastmoney_list.html', 'eastmoney_detail.html'),
+    '新浪财经': ('sina_list.html', None),
+    '财经网': ('caijing_list.html', None),
+    '界面新闻': ('jiemian_list.html', None),
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='爬虫离线基准测试')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟网站的平均响应延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟网站返回 500 的比例')
+    parser.add_argument('--rounds', type=int, default=3, help='每种爬取模式的轮数')
+    parser.add_argument('--modes', default='sequential,concurrent', help='要比较的爬取模式，逗号分隔')
+    parser.add_argument('--parse-iterations', type=int, default=100, help='解析测试每个页面的重复次数')
+    parser.add_argument('--parse-threads', type=int, default=1, help='解析测试的并发线程数，与 PARSE_MODE=process 配合测试多核扩展')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    return parser.parse_args()
+
+def fixture_response(name):
+    """构造与真实请求相同的响应对象"""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response._content = load_fixture(name).replace('{page}', '1').encode('utf-8')
+    response.encoding = 'utf-8'
+    # 详情页通过 iter_content 读取，标记为已读取后从 _content 中分块返回
+    response._content_consumed = True
+    return response
+
+def timed_repeat(func, iterations, threads):
+    """用 threads 个线程共调用 func iterations 次，返回 (耗时, 最后一次的结果)"""
+    start = time.perf_counter()
+    if threads <= 1:
+        for _ in range(iterations):
+            result = func()
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = [executor.submit(func) for _ in range(iterations)]
+            result = results[-1].result()
+    return time.perf_counter() - start, result
+
+def bench_parse(app, iterations, threads=1):
+    """测试各来源列表页和详情页的解析速度"""
+    crawler = app.FinanceNewsCrawler()
+    results = {}
+    for name, (list_fixture, detail_fixture) in SOURCE_FIXTURES.items():
+        response = fixture_response(list_fixture)
+        # 预热，进程池模式下启动子进程
+        crawler.parse_list(name, response)
+        elapsed, items = timed_repeat(lambda: crawler.parse_list(name, response), iterations, threads)
+        result = {
+            'list_pages_per_sec': iterations / elapsed,
+            'items_per_page': len(items),
+            'list_kb_per_sec': len(response.content) * iterations / elapsed / 1024,
+        }
+
+        if detail_fixture:
+            detail = fixture_response(detail_fixture)
+            elapsed, _ = timed_repeat(lambda: crawler.parse_detail(name, detail), iterations, threads)
+            result['detail_pages_per_sec'] = iterations / elapsed
+        results[name] = result
+    return results
+
+def bench_cycle(app, server, mode, rounds):
+    """用本地模拟网站执行若干轮完整爬取"""
+    runs = []
+    for _ in range(rounds):
+        server.reset_counts()
+        crawler = app.FinanceNewsCrawler()
+        mount(crawler.session, server.port)
+        start = time.perf_counter()
+        news = crawler.crawl_all_sources(mode=mode)
+        elapsed = time.perf_counter() - start
+        runs.append({
+            'seconds': elapsed,
+            'news': len(news),
+            'requests': sum(server.counts.values()),
+            'server_errors': sum(server.errors.values()),
+            'requests_by_host': dict(server.counts),
+            'failed_sources': sorted(crawler.errors),
+        })
+    seconds = [run['seconds'] for run in runs]
+    return {
+        'mean_seconds': statistics.mean(seconds),
+        'min_seconds': min(seconds),
+        'runs': runs,
+    }
+
+def print_report(config, parse_results, cycle_results):
+    print('配置: ' + ', '.join(f'{key}={value}' for key, value in config.items()))
+    print()
+    print('解析吞吐量')
+    print(f"{'来源':<8}{'列表页/秒':>12}{'条/页':>8}{'KB/秒':>10}{'详情页/秒':>12}")
+    for name, result in parse_results.items():
+        detail = result.get('detail_pages_per_sec')
+        detail = f"{detail:.1f}" if detail else '-'
+        print(
+            f"{name:<8}{result['list_pages_per_sec']:>14.1f}{result['items_per_page']:>10}"
+            f"{result['list_kb_per_sec']:>12.0f}{detail:>14}"
+        )
+    print()
+    print('一轮爬取')
+    print(f"{'模式':<12}{'平均耗时(秒)':>14}{'最短(秒)':>10}{'新闻数':>8}{'请求数':>8}{'500次数':>8}")
+    for mode, result in cycle_results.items():
+        last = result['runs'][-1]
+        print(
+            f"{mode:<12}{result['mean_seconds']:>18.2f}{result['min_seconds']:>12.2f}"
+            f"{last['news']:>10}{last['requests']:>10}{last['server_errors']:>10}"
+        )
+        for host, count in sorted(last['requests_by_host'].items()):
+            print(f"    {host}: {count} 次请求")
+        if last['failed_sources']:
+            print(f"    失败来源: {', '.join(last['failed_sources'])}")
+
+def main():
+    args = parse_args()
+
+    # 使用临时数据库，不读写HTTP缓存
+    workdir = tempfile.mkdtemp(prefix='crawler_bench_')
+    os.environ['DB_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ['HTTP_CACHE_DIR'] = ''
+    os.environ['RUN_SCHEDULER'] = '0'
+    os.environ.setdefault('HOST_RATE', '20')
+    os.environ.setdefault('HOST_BURST', '5')
+    logging.basicConfig(level=logging.WARNING)
+
+    try:
+        run(args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def run(args):
+    import app
+    logging.getLogger('app').setLevel(logging.WARNING)
+    app.init_db()
+
+    config = {
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'HOST_RATE': app.HOST_RATE,
+        'HOST_BURST': app.HOST_BURST,
+        'HOST_CONCURRENCY': app.HOST_CONCURRENCY,
+        'CRAWL_WORKERS': app.CRAWL_WORKERS,
+        'DETAIL_WORKERS': app.DETAIL_WORKERS,
+        'CRAWL_INCREMENTAL': app.CRAWL_INCREMENTAL,
+        'CRAWL_MAX_PAGES': app.CRAWL_MAX_PAGES,
+        'PARSE_MODE': app.parsing.PARSE_MODE,
+        'PARSE_WORKERS': app.parsing.PARSE_WORKERS,
+        'HTML_PARSER': app.parsing.HTML_PARSER,
+        'parse_threads': args.parse_threads,
+    }
+
+    parse_results = bench_parse(app, args.parse_iterations, args.parse_threads)
+
+    server = FixtureServer(args.latency, args.error_rate).start()
+    try:
+        cycle_results = {
+            mode: bench_cycle(app, server, mode, args.rounds)
+            for mode in args.modes.split(',') if mode
+        }
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps({
+            'config': config,
+            'parse': parse_results,
+            'cycle': cycle_results,
+        }, ensure_ascii=False, indent=2))
+    else:
+        print_report(config, parse_results, cycle_results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""本地模拟新闻网站
+
+按请求的 Host 和路径返回 fixtures 目录下的页面，用于离线测试爬虫性能。
+页面中的 {page} 会被替换为请求的页码，使每一页的新闻链接不同。
+可配置响应延迟和错误率，并统计各主机的请求数。
+"""
+import os
+import re
+import time
+import random
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from requests.adapters import HTTPAdapter
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# (主机, 路径正则, 页面文件)，正则中的 page 分组为页码
+ROUTES = [
+    ('finance.eastmoney.com', r'/news/cywjh(?:_(?P<page>\d+))?\.html', 'eastmoney_list.html'),
+    ('finance.eastmoney.com', r'/a/\d+\.html', 'eastmoney_detail.html'),
+    ('finance.sina.com.cn', r'/roll/index\.d\.html', 'sina_list.html'),
+    ('www.caijing.com.cn', r'/', 'caijing_list.html'),
+    ('www.jiemian.com', r'/lists/48(?:_(?P<page>\d+))?\.html', 'jiemian_list.html'),
+]
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # 并发爬取时会同时建立多个连接
+    request_queue_size = 128
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+class FixtureServer:
+    """在后台线程运行的本地HTTP服务
+
+    latency 为每个请求的平均延迟（秒），实际延迟在 0.5 到 1.5 倍之间随机；
+    error_rate 为返回 500 的比例。
+    """
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.counts = Counter()
+        self.errors = Counter()
+        self._lock = threading.Lock()
+        self._fixtures = {name: load_fixture(name) for _, _, name in ROUTES}
+        self._routes = [(host, re.compile(pattern), name) for host, pattern, name in ROUTES]
+        self.httpd = _Server(('127.0.0.1', 0), self._handler())
+        self.port = self.httpd.server_address[1]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = server.handle(self.headers.get('Host', ''), self.path)
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, host, path):
+        """返回 (状态码, 页面内容)"""
+        host = host.split(':')[0]
+        parts = urlsplit(path)
+        with self._lock:
+            self.counts[host] += 1
+            delay = self.latency * (0.5 + self.random.random())
+            failed = self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            with self._lock:
+                self.errors[host] += 1
+            return 500, 'Internal Server Error'
+
+        for route_host, pattern, name in self._routes:
+            match = pattern.fullmatch(parts.path)
+            if route_host != host or not match:
+                continue
+            page = match.groupdict().get('page') or parse_qs(parts.query).get('page', ['1'])[0]
+            return 200, self._fixtures[name].replace('{page}', page)
+        return 404, 'Not Found'
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts.clear()
+            self.errors.clear()
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# 将发往任意主机的请求改发到本地服务，保留原始 Host
+class RewriteAdapter(HTTPAdapter):
+    def __init__(self, port, **kwargs):
+        self.port = port
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.headers['Host'] = parts.netloc
+        request.url = f"http://127.0.0.1:{self.port}{parts.path or '/'}"
+        if parts.query:
+            request.url += f"?{parts.query}"
+        return super().send(request, **kwargs)
+
+def mount(session, port, pool_size=32):
+    """让 requests 会话的所有请求改发到本地服务"""
+    adapter = RewriteAdapter(port, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='运行本地模拟新闻网站')
+    parser.add_argument('--latency', type=float, default=0.0, help='平均响应延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 500 的比例')
+    args = parser.parse_args()
+
+    server = FixtureServer(args.latency, args.error_rate).start()
+    print(f"本地服务已启动: http://127.0.0.1:{server.port}/")
+    print(f"示例: curl -H 'Host: finance.eastmoney.com' http://127.0.0.1:{server.port}/news/cywjh.html")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
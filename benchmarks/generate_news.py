@@ -0,0 +1,149 @@
+"""生成模拟新闻数据
+
+按时间顺序向数据库写入大量模拟新闻（中文标题和正文、各来源、指定天数内的时间），
+用于测试大数据量下接口的性能。写入经过 news 表上的触发器，全文索引和统计汇总同步生成；
+近似重复分组不会计算，需要时运行 flask --app app rebuild-clusters。
+
+    python benchmarks/generate_news.py --rows 1000000 --db finance_news.db
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 各来源的占比和链接格式
+SOURCE_WEIGHTS = {
+    '东方财富网': 0.4,
+    '新浪财经': 0.3,
+    '财经网': 0.15,
+    '界面新闻': 0.15,
+}
+SOURCE_URLS = {
+    '东方财富网': 'http://finance.eastmoney.com/a/{date}{n}.html',
+    '新浪财经': 'https://finance.sina.com.cn/roll/{day}/doc-{n}.shtml',
+    '财经网': 'http://economy.caijing.com.cn/{date}/{n}.shtml',
+    '界面新闻': 'https://www.jiemian.com/article/{n}.html',
+}
+
+SUBJECTS = [
+    '央行', '证监会', '沪深两市', '创业板', '北向资金', '人民币汇率', '美联储', '国常会', '发改委',
+    '财政部', '金融监管总局', '港股', '科创板', 'A股三大指数', '上证指数', '深证成指', '宁德时代',
+    '贵州茅台', '比亚迪', '招商银行', '中国平安', '隆基绿能', '工业富联', '中芯国际', '恒生科技指数',
+    '原油期货', '黄金价格', '国债收益率', '房地产板块', '光伏板块', '半导体板块', '券商板块',
+    '白酒板块', '创新药企业', '新能源车企', '公募基金', '险资', '外资机构', '地方政府专项债', '上市银行',
+]
+VERBS = [
+    '宣布', '发布', '表示', '预计', '大幅上涨', '小幅下跌', '震荡走高', '午后拉升', '尾盘跳水',
+    '创年内新高', '回落', '获批', '加码布局', '下调', '上调', '启动', '暂停', '完成', '披露', '公布',
+]
+OBJECTS = [
+    '存款准备金率', '一季度业绩预告', '新一轮回购计划', '稳增长政策', '跨境理财通试点', '全面注册制改革',
+    '新能源汽车补贴', '设备更新行动方案', '超长期特别国债', '中期借贷便利操作', '互联互通机制优化',
+    '年度经营目标', '海外并购交易', '定向增发方案', '分红派息方案', '减持计划', '两融余额',
+    '成交额突破万亿', '贷款市场报价利率', '社会融资规模数据', 'CPI同比数据', 'PMI数据', '出口数据',
+]
+TAILS = [
+    '', '', '', '，市场人士解读', '，机构称影响有限', '，券商最新研判来了', '，多只个股涨停',
+    '，外资持续流入', '，业内人士：短期内波动加大', '，附解读', '（附名单）',
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='生成模拟新闻数据')
+    parser.add_argument('--db', default=None, help='数据库路径，默认使用 DB_PATH 环境变量或 finance_news.db')
+    parser.add_argument('--rows', type=int, default=1000000, help='生成的新闻条数')
+    parser.add_argument('--days', type=int, default=365, help='新闻时间分布的天数（截至当前）')
+    parser.add_argument('--batch', type=int, default=10000, help='每个事务写入的条数')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    return parser.parse_args()
+
+def make_title(rnd):
+    return rnd.choice(SUBJECTS) + rnd.choice(VERBS) + rnd.choice(OBJECTS) + rnd.choice(TAILS)
+
+def make_content(rnd):
+    """与爬虫一致：正文截断到500字并加省略号"""
+    sentences = []
+    length = 0
+    while length < 520:
+        sentence = make_title(rnd) + '。'
+        sentences.append(sentence)
+        length += len(sentence)
+    return ''.join(sentences)[:500] + '...'
+
+def generate_rows(rnd, sources, count, start, end, run_id):
+    """按时间顺序生成 count 条新闻"""
+    names = list(SOURCE_WEIGHTS)
+    weights = [SOURCE_WEIGHTS[name] for name in names]
+    span = (end - start).total_seconds()
+    offsets = sorted(rnd.random() * span for _ in range(count))
+    for i, offset in enumerate(offsets):
+        created = start + timedelta(seconds=offset)
+        published = created - timedelta(minutes=rnd.randint(1, 120))
+        source = rnd.choices(names, weights)[0]
+        if source == '东方财富网':
+            content = make_content(rnd)
+        else:
+            # 其他来源只抓取列表页，正文为占位文字
+            content = sources[source]['default_content']
+        url = SOURCE_URLS[source].format(
+            date=created.strftime('%Y%m%d'),
+            day=created.strftime('%Y-%m-%d'),
+            n=f'{run_id}{i:09d}'
+        )
+        yield (
+            make_title(rnd), content, source, url,
+            published.isoformat(), created.strftime('%Y-%m-%d %H:%M:%S')
+        )
+
+def main():
+    args = parse_args()
+    if args.db:
+        os.environ['DB_PATH'] = args.db
+    os.environ['RUN_SCHEDULER'] = '0'
+    logging.basicConfig(level=logging.INFO)
+
+    import app
+    import storage
+
+    app.init_db()
+    rnd = random.Random(args.seed)
+    end = datetime.utcnow()
+    start = end - timedelta(days=args.days)
+    # 区分多次生成的数据，避免链接重复
+    run_id = f'{int(time.time()) % 100000:05d}'
+
+    inserted = 0
+    started = time.perf_counter()
+    rows = generate_rows(rnd, app.SOURCES, args.rows, start, end, run_id)
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            batch = [row + (app.url_key(row[3]),) for _, row in zip(range(args.batch), rows)]
+            if not batch:
+                break
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany('''
+                INSERT OR IGNORE INTO news (title, content, source, url, published_at, created_at, url_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            inserted += cursor.rowcount
+            conn.commit()
+            elapsed = time.perf_counter() - started
+            print(f"已写入 {inserted}/{args.rows} 条，{inserted / elapsed:.0f} 条/秒", flush=True)
+
+        cursor.execute("BEGIN IMMEDIATE")
+        app.bump_data_generation(cursor)
+        conn.commit()
+        # 更新统计信息，供查询优化器使用
+        cursor.execute("ANALYZE")
+        conn.commit()
+
+    print(f"完成：共写入 {inserted} 条新闻到 {storage.DB_PATH}，耗时 {time.perf_counter() - started:.1f} 秒")
+
+if __name__ == '__main__':
+    main()
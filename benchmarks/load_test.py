@@ -0,0 +1,197 @@
+"""接口压力测试
+
+按场景（接口和参数组合）并发请求，统计每个场景的吞吐量和 p50/p95/p99 延迟。
+可以请求运行中的服务（flask run 或 gunicorn），也可以用 --in-process 在本进程内
+通过 Flask 测试客户端直接调用应用。
+
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --requests 500 --concurrency 16
+    DB_PATH=finance_news.db python benchmarks/load_test.py --in-process --scenarios news_deep_page,search_common
+
+默认每个请求附带不同的 _ 参数绕过响应缓存，测量数据库查询本身；传入 --cached 测试缓存命中。
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import itertools
+import statistics
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 场景名称 -> (路径, 参数)；参数中的 cursor 为 None 时在运行前取第 DEEP_PAGE 页的游标
+DEEP_PAGE = 500
+SCENARIOS = {
+    'index': ('/', {}),
+    'stats': ('/api/stats', {}),
+    'sources': ('/api/sources', {}),
+    'news_first_page': ('/api/news', {'limit': 20}),
+    'news_cursor_first': ('/api/news', {'limit': 20, 'cursor': ''}),
+    'news_deep_page': ('/api/news', {'limit': 20, 'page': DEEP_PAGE}),
+    'news_deep_cursor': ('/api/news', {'limit': 20, 'cursor': None}),
+    'news_source': ('/api/news', {'limit': 20, 'source': '新浪财经'}),
+    'news_source_deep_page': ('/api/news', {'limit': 20, 'source': '新浪财经', 'page': DEEP_PAGE // 2}),
+    'news_collapse': ('/api/news', {'limit': 20, 'collapse': 1, 'cursor': ''}),
+    'search_common': ('/api/news', {'limit': 20, 'search': '央行'}),
+    'search_phrase': ('/api/news', {'limit': 20, 'search': '存款准备金率'}),
+    'search_relevance': ('/api/news', {'limit': 20, 'search': '降准 央行', 'sort': 'relevance'}),
+    'search_source': ('/api/news', {'limit': 20, 'search': '回购', 'source': '东方财富网'}),
+    # 单个字符无法使用全文索引，退化为 LIKE 全表扫描
+    'search_single_char': ('/api/news', {'limit': 20, 'search': '股'}),
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='接口压力测试')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='服务地址')
+    parser.add_argument('--in-process', action='store_true', help='在本进程内调用应用，不经过网络')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='要测试的场景，逗号分隔')
+    parser.add_argument('--requests', type=int, default=200, help='每个场景的请求数')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发数')
+    parser.add_argument('--warmup', type=int, default=5, help='每个场景正式测试前的预热请求数')
+    parser.add_argument('--cached', action='store_true', help='不绕过响应缓存')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    return parser.parse_args()
+
+def percentile(sorted_values, p):
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class HttpClient:
+    def __init__(self, base_url, pool_size):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path):
+        """返回 (状态码, 响应体)"""
+        response = self.session.get(self.base_url + path, timeout=60)
+        return response.status_code, response.content
+
+class InProcessClient:
+    def __init__(self):
+        import app
+        app.init_db()
+        self.app = app.app
+        self._local = threading.local()
+
+    def get(self, path):
+        # 测试客户端不能在线程间共享
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.get(path)
+        return response.status_code, response.get_data()
+
+def resolve_params(client, params):
+    """取深翻页游标：先按页码请求第 DEEP_PAGE 页，使用其返回的 next_cursor"""
+    params = dict(params)
+    if params.get('cursor', '') is None:
+        status, body = client.get('/api/news?' + urlencode({'limit': params['limit'], 'page': DEEP_PAGE}))
+        next_cursor = json.loads(body).get('next_cursor') if status == 200 else None
+        params['cursor'] = next_cursor or ''
+    return params
+
+def run_scenario(client, path, params, total, concurrency, warmup, cached):
+    counter = itertools.count()
+
+    def url_for(i):
+        query = dict(params)
+        if not cached:
+            query['_'] = i
+        return path + ('?' + urlencode(query) if query else '')
+
+    for i in range(warmup):
+        client.get(url_for(next(counter)))
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(count):
+        for _ in range(count):
+            url = url_for(next(counter))
+            start = time.perf_counter()
+            try:
+                status, _ = client.get(url)
+                error = None if status < 400 else f'HTTP {status}'
+            except Exception as e:
+                error = str(e)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if error:
+                    errors.append(error)
+
+    shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, shares))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'throughput': len(latencies) / wall if wall else None,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else None,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p95_ms': percentile(latencies, 95) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+        'max_ms': latencies[-1] * 1000 if latencies else None,
+    }
+
+def print_report(results):
+    print(f"{'场景':<24}{'请求':>7}{'错误':>6}{'req/s':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<24}{result['requests']:>7}{result['errors']:>6}{result['throughput']:>9.1f}"
+            f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['max_ms']:>10.1f}"
+        )
+        if result['first_error']:
+            print(f"    首个错误: {result['first_error']}")
+
+def main():
+    args = parse_args()
+    names = [name for name in args.scenarios.split(',') if name]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"未知场景: {', '.join(unknown)}，可选: {', '.join(SCENARIOS)}")
+
+    if args.in_process:
+        os.environ['RUN_SCHEDULER'] = '0'
+        logging.basicConfig(level=logging.WARNING)
+        client = InProcessClient()
+    else:
+        client = HttpClient(args.url, args.concurrency)
+
+    results = {}
+    for name in names:
+        path, params = SCENARIOS[name]
+        params = resolve_params(client, params)
+        results[name] = run_scenario(
+            client, path, params, args.requests, args.concurrency, args.warmup, args.cached
+        )
+        if not args.json:
+            print(f"{name} 完成", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_report(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+# gunicorn 配置：每个 worker 启动后初始化数据库并参与定时爬取的主进程选举，
+# 只有一个 worker 执行定时爬取，该 worker 退出后由其他 worker 接管
+
+# 新闻推送（/api/stream）的每个连接长期占用一个线程，使用多线程 worker
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# 多进程指标：各 worker 将指标写入该目录，/metrics 汇总所有 worker 的数据。
+# 需要在 worker 导入 prometheus_client 之前设置
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'finance_news_metrics'))
+
+def on_starting(server):
+    # 清理上次运行留下的指标文件
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith('.db'):
+            os.remove(os.path.join(path, name))
+
+def post_worker_init(worker):
+    from app import bootstrap
+    bootstrap()
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,71 @@
+"""Prometheus 指标
+
+使用 gunicorn 多进程运行时，gunicorn.conf.py 在启动 worker 前设置
+PROMETHEUS_MULTIPROC_DIR，各 worker 将指标写入该目录，/metrics 汇总所有 worker 的数据。
+单进程运行（flask run / python app.py）时使用默认的进程内注册表。
+"""
+import os
+import re
+import functools
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+# 抓取网页耗时的分桶（秒）
+FETCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# 解析网页、执行SQL耗时的分桶（秒）
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# 爬虫：page 为 list（列表页）或 detail（详情页）
+FETCH_SECONDS = Histogram(
+    'crawler_fetch_seconds', '抓取网页耗时（不含限流等待，详情页只统计到收到响应头）', ['source', 'page'],
+    buckets=FETCH_BUCKETS
+)
+FETCH_ERRORS = Counter(
+    'crawler_fetch_errors_total', '抓取网页失败次数，reason 为 timeout / connection / http_status',
+    ['source', 'page', 'reason']
+)
+PARSE_SECONDS = Histogram(
+    'crawler_parse_seconds', '解析网页耗时（详情页边读取边解析，包含读取响应体）', ['source', 'page'],
+    buckets=FAST_BUCKETS
+)
+# stage 为 found（列表页解析出的条数）、new（去重后需要抓取的条数）、inserted（写入数据库的条数）
+CRAWL_ITEMS = Counter('crawler_items_total', '各阶段的新闻条数', ['source', 'stage'])
+# method 为确定页面编码的方式：header（响应头）、meta（页面开头的声明）、cache（该主机上次的编码）、detect（完整检测）
+CHARSET_RESOLUTIONS = Counter('crawler_charset_total', '确定网页编码的次数', ['source', 'method'])
+CRAWL_FAILURES = Counter('crawler_source_failures_total', '来源整体爬取失败次数', ['source'])
+
+# 写入
+INGEST_SECONDS = Histogram('ingest_batch_seconds', '写入一批爬取结果的耗时', buckets=FAST_BUCKETS)
+
+# 接口：流式响应只统计到开始发送
+REQUEST_SECONDS = Histogram(
+    'http_request_seconds', '接口处理耗时', ['route', 'method', 'status'], buckets=FAST_BUCKETS
+)
+
+# 数据库：operation 为语句类型，table 为语句涉及的第一张表
+QUERY_SECONDS = Histogram(
+    'db_query_seconds', 'SQLite 语句执行耗时', ['operation', 'table'], buckets=FAST_BUCKETS
+)
+
+_SQL_OPERATION = re.compile(r'\s*(\w+)')
+_SQL_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(\w+)', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def query_labels(sql):
+    """从SQL语句中提取 (语句类型, 表名)，用作指标标签"""
+    match = _SQL_OPERATION.match(sql)
+    operation = match.group(1).upper() if match else ''
+    match = _SQL_TABLE.search(sql)
+    table = match.group(1).lower() if match else ''
+    return operation, table
+
+def render():
+    """生成指标文本，返回 (内容, Content-Type)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,340 @@
+"""网页解析
+
+按来源配置（app.SOURCES）只解析需要的元素，不构建整个页面的文档树：
+列表页用 SoupStrainer 只保留新闻条目（或新闻列表所在的元素）；详情页用 lxml 增量解析器边读边解析，
+读到正文元素结束或正文超过字数上限即停止读取。
+
+列表页的解析函数只接收解码后的文本和来源配置，返回普通的字典，可以在当前线程执行，
+也可以交给进程池执行，使解析不受 GIL 限制、随CPU核数扩展。详情页的解析与读取
+响应交替进行，始终在抓取线程中执行。
+
+页面编码依次根据响应头、页面开头的 <meta charset> 和该主机上次使用的编码确定，
+都不可用时才对整个页面做完整的编码检测；GBK、GB2312 一律按其超集 GB18030 解码。
+单字节编码（ISO-8859-1、cp1252 等）几乎能解码任何字节，无法验证声明是否正确，
+因此先严格尝试 DETECT_CHARSETS，且不缓存单字节编码。
+"""
+import os
+import re
+import codecs
+import logging
+import functools
+import threading
+import multiprocessing
+from datetime import datetime
+from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+from lxml import etree
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# 解析模式：inline 在调用线程中解析，process 交给进程池解析
+PARSE_MODE = os.environ.get('PARSE_MODE', 'inline')
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', os.cpu_count() or 1))
+# BeautifulSoup 使用的解析器：html.parser（纯 Python）或 lxml（C 实现，更快）
+HTML_PARSER = os.environ.get('HTML_PARSER', 'html.parser')
+# 详情页正文保留的字数，超出部分截断（来源配置中的 detail_chars 可单独指定）
+DETAIL_MAX_CHARS = int(os.environ.get('DETAIL_MAX_CHARS', 500))
+# 详情页最多读取的字节数，超出后即使没有找到正文也停止读取
+DETAIL_MAX_BYTES = int(os.environ.get('DETAIL_MAX_BYTES', 2 * 1024 * 1024))
+# 流式读取详情页时每块的字节数
+DETAIL_CHUNK_SIZE = int(os.environ.get('DETAIL_CHUNK_SIZE', 16384))
+# 在页面开头多少字节内查找 <meta charset>
+CHARSET_SNIFF_BYTES = int(os.environ.get('CHARSET_SNIFF_BYTES', 4096))
+
+def has_class(value, class_name):
+    """value 为元素的 class 属性原文，可能包含多个 class"""
+    return class_name is None or (value is not None and class_name in value.split())
+
+def item_strainer(tag, class_name):
+    """只保留 (标签, class) 匹配的元素及其子元素"""
+    if class_name is None:
+        return SoupStrainer(tag)
+    # SoupStrainer 按属性原文比较，class="title red" 不能匹配 class_='title'
+    return SoupStrainer(tag, class_=lambda value: has_class(value, class_name))
+
+def parse_list_page(spec, name, content):
+    """按来源配置解析列表页，content 为已解码的文本，返回新闻列表（链接未规范化）"""
+    tag, class_name = spec['item']
+    # 指定了 container 时只解析新闻列表所在的元素，避免匹配到导航等处的同名元素
+    strainer = item_strainer(*spec.get('container', spec['item']))
+    soup = BeautifulSoup(content, HTML_PARSER, parse_only=strainer)
+
+    news_list = []
+    for article in soup.find_all(tag, class_=class_name):
+        link_tag = article.find('a')
+        if link_tag:
+            title = link_tag.text.strip()
+            url = link_tag.get('href')
+            if url and not url.startswith('http'):
+                url = urljoin(spec['base_url'], url)
+
+            news_list.append({
+                'title': title,
+                'content': spec['default_content'],
+                'source': name,
+                'url': url,
+                'published_at': datetime.now().isoformat()
+            })
+    return news_list
+
+def header_charset(content_type):
+    """从 Content-Type 响应头中取 charset，没有时返回None"""
+    for param in (content_type or '').split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
+
+# 匹配 <meta charset="gbk"> 和 <meta http-equiv="Content-Type" content="text/html; charset=gbk">
+_META_CHARSET = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([-\w.:]+)', re.IGNORECASE)
+
+def meta_charset(content):
+    """从页面开头的 BOM 或 <meta> 标签中取编码，没有时返回None"""
+    if content.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    match = _META_CHARSET.search(content[:CHARSET_SNIFF_BYTES])
+    return match.group(1).decode('ascii') if match else None
+
+def normalize_charset(charset):
+    """转换为 Python 编解码器名称，GBK、GB2312 使用其超集 GB18030；无法识别时返回None"""
+    if not charset:
+        return None
+    try:
+        name = codecs.lookup(charset.strip()).name
+    except LookupError:
+        return None
+    # 声明为 GB2312 的网站常常使用 GBK 才有的字，GB18030 兼容两者
+    return 'gb18030' if name in ('gb2312', 'gbk') else name
+
+@functools.lru_cache(maxsize=None)
+def is_single_byte(encoding):
+    """每个字节单独对应一个字符的编码，几乎任何字节序列都能解码，解码成功不能说明编码正确"""
+    decoded = 0
+    for byte in range(0x80, 0x100):
+        try:
+            decoded += len(bytes([byte]).decode(encoding)) == 1
+        except UnicodeDecodeError:
+            pass
+    # cp1252 等编码有少数未定义的字节，多字节编码的单个高位字节都无法解码
+    return decoded > 0x40
+
+# 各主机最近一次确定的编码，用于响应头和页面都没有声明编码的情况，只缓存多字节编码
+charset_cache = {}
+# 没有可用的多字节编码声明时依次严格尝试的编码
+DETECT_CHARSETS = ('utf-8', 'gb18030')
+
+def _charset_candidates(content, content_type, key):
+    """按尝试顺序返回 (方式, 编码) 列表，已去掉无法识别和重复的编码
+
+    先是响应头、<meta> 和缓存中的多字节编码，然后是 DETECT_CHARSETS（方式为 detect），
+    最后才是声明的单字节编码。
+    """
+    declared = []
+    for method, charset in (
+        ('header', header_charset(content_type)),
+        ('meta', meta_charset(content)),
+        ('cache', charset_cache.get(key)),
+    ):
+        encoding = normalize_charset(charset)
+        if encoding and encoding not in [tried for _, tried in declared]:
+            declared.append((method, encoding))
+    candidates = [(method, encoding) for method, encoding in declared if not is_single_byte(encoding)]
+    candidates += [
+        ('detect', encoding) for encoding in DETECT_CHARSETS
+        if encoding not in [tried for _, tried in candidates]
+    ]
+    candidates += [(method, encoding) for method, encoding in declared if is_single_byte(encoding)]
+    return candidates
+
+def _learn_charset(key, encoding, method, source):
+    if key and not is_single_byte(encoding):
+        charset_cache[key] = encoding
+    metrics.CHARSET_RESOLUTIONS.labels(source, method).inc()
+
+def _detect_charset(content, tried):
+    """完整的编码检测，返回 (编码, 解码后的文本)"""
+    dammit = UnicodeDammit(content, DETECT_CHARSETS, is_html=True, exclude_encodings=tried)
+    encoding = normalize_charset(dammit.original_encoding) or 'utf-8'
+    return encoding, dammit.unicode_markup
+
+def decode_html(content, content_type=None, key=None, source=''):
+    """确定编码并解码整个页面
+
+    key 为缓存编码使用的主机名，source 用于指标标签。
+    """
+    candidates = _charset_candidates(content, content_type, key)
+    for method, encoding in candidates:
+        # 单字节编码排在最后，个别未定义的字节替换掉
+        errors = 'replace' if is_single_byte(encoding) else 'strict'
+        try:
+            text = content.decode(encoding, errors)
+        except UnicodeDecodeError:
+            continue
+        _learn_charset(key, encoding, method, source)
+        return text
+
+    encoding, text = _detect_charset(content, [encoding for _, encoding in candidates])
+    _learn_charset(key, encoding, 'detect', source)
+    return text if text is not None else content.decode(encoding, 'replace')
+
+def _decodes_prefix(head, encoding):
+    """head 能否按 encoding 解码，增量解码允许末尾有被截断的多字节字符"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(head)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def resolve_charset(head, content_type=None, key=None, source=''):
+    """只根据页面开头的字节确定编码，用于流式读取"""
+    candidates = _charset_candidates(head, content_type, key)
+    for method, encoding in candidates:
+        # 页面开头可能截断在多字节字符中间，UnicodeDammit 会因此排除 UTF-8，先按增量解码尝试
+        if is_single_byte(encoding) or _decodes_prefix(head, encoding):
+            _learn_charset(key, encoding, method, source)
+            return encoding
+
+    encoding, _ = _detect_charset(head, [encoding for _, encoding in candidates])
+    _learn_charset(key, encoding, 'detect', source)
+    return encoding
+
+class DetailExtractor:
+    """增量解析详情页，提取 spec['detail'] 指定元素的文本
+
+    逐块调用 feed，返回 True 表示已得到需要的内容，不必继续读取：
+    正文元素已结束，或正文已超过字数上限。读到 CHARSET_SNIFF_BYTES 字节后
+    确定编码，之后的内容由 lxml 按该编码直接解码。
+    """
+    def __init__(self, spec, content_type=None, key=None, source=''):
+        self.tag, self.class_name = spec['detail']
+        self.max_chars = spec.get('detail_chars', DETAIL_MAX_CHARS)
+        self.default_content = spec['default_content']
+        self.content_type = content_type
+        self.key = key
+        self.source = source
+        self.parser = None
+        self.head = b''
+        self.target = None
+        self.finished = False
+        self.received = 0
+
+    def _start(self):
+        """确定编码并创建解析器，返回缓存的页面开头"""
+        encoding = resolve_charset(self.head, self.content_type, self.key, self.source)
+        # libxml2 会自行跳过 BOM
+        if encoding == 'utf-8-sig':
+            encoding = 'utf-8'
+        try:
+            self.parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+        except LookupError:
+            # lxml 不认识的编码，由 lxml 根据页面自行判断
+            self.parser = etree.HTMLPullParser(events=('start', 'end'))
+        head, self.head = self.head, b''
+        return head
+
+    def feed(self, chunk):
+        self.received += len(chunk)
+        if self.parser is None:
+            self.head += chunk
+            if len(self.head) < CHARSET_SNIFF_BYTES:
+                return False
+            chunk = self._start()
+        self.parser.feed(chunk)
+        self._read_events()
+        if self.target is not None and len(self.text()) > self.max_chars:
+            self.finished = True
+        return self.finished or self.received >= DETAIL_MAX_BYTES
+
+    def close(self):
+        """响应读取完毕时调用，处理剩余内容"""
+        if self.finished:
+            return
+        if self.parser is None:
+            # 页面不足 CHARSET_SNIFF_BYTES 字节
+            if not self.head:
+                return
+            head = self._start()
+            self.parser.feed(head)
+        self.parser.close()
+        self._read_events()
+
+    def _read_events(self):
+        for event, element in self.parser.read_events():
+            if self.finished:
+                break
+            if self.target is None:
+                if event == 'start':
+                    if element.tag == self.tag and has_class(element.get('class'), self.class_name):
+                        self.target = element
+                else:
+                    # 正文之前已结束的元素不会再用到，释放其子元素
+                    element.clear(keep_tail=True)
+            elif event == 'end' and element is self.target:
+                self.finished = True
+
+    def text(self):
+        return ''.join(self.target.itertext()).strip() if self.target is not None else ''
+
+    def result(self):
+        """返回截断到字数上限的正文，没有找到正文元素时返回默认内容"""
+        if self.target is None:
+            return self.default_content
+        text = self.text()
+        return text[:self.max_chars] + "..." if len(text) > self.max_chars else text
+
+def extract_detail(spec, chunks, content_type=None, key=None, source=''):
+    """从详情页的字节块中提取正文，得到需要的内容后停止读取 chunks"""
+    extractor = DetailExtractor(spec, content_type, key, source)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+    else:
+        extractor.close()
+    return extractor.result()
+
+# 解析进程池，在第一次使用时创建。使用 spawn 方式启动子进程，
+# 避免从多线程的爬虫进程 fork 时继承其他线程持有的锁。
+# 子进程异常退出（如被 OOM killer 结束）后进程池不再可用，重新创建并重试一次
+class ParsePool:
+    def __init__(self, workers=PARSE_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get(self, broken=None):
+        """返回进程池，broken 为已损坏的进程池，仍在使用时重新创建"""
+        with self._lock:
+            # fork 出的子进程不能使用父进程的进程池
+            if self._pid != os.getpid() or (broken is not None and self._executor is broken):
+                if self._pid == os.getpid() and self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                self._pid = os.getpid()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def run(self, func, *args):
+        """按 PARSE_MODE 执行解析函数并返回结果"""
+        if PARSE_MODE != 'process':
+            return func(*args)
+        executor = self._get()
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            # 多个线程同时发现时只重新创建一次
+            logger.warning("解析进程异常退出，重新创建进程池")
+            return self._get(executor).submit(func, *args).result()
+
+parse_pool = ParsePool()
+
+def run(func, *args):
+    """执行解析函数，用法：parsing.run(parsing.parse_list_page, spec, name, content)"""
+    return parse_pool.run(func, *args)
@@ -0,0 +1,371 @@
+"""数据库连接层
+
+所有数据库访问通过 connection() 从连接池获取长连接。连接启用 WAL 模式，
+读请求不会被爬虫写入阻塞，多个 gunicorn 进程可以同时读取。
+"""
+import os
+import re
+import json
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# 从环境变量获取配置
+DB_PATH = os.environ.get('DB_PATH', 'finance_news.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+# 等待写锁或空闲连接的超时时间（秒）
+DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', 10))
+DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 16384))
+DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+# 每个连接缓存的预编译语句数
+DB_STATEMENT_CACHE = int(os.environ.get('DB_STATEMENT_CACHE', 256))
+# 语句分析：记录每类语句的耗时和行数，超过阈值（毫秒）的慢语句连同查询计划写入日志
+DB_PROFILE = os.environ.get('DB_PROFILE', '0') == '1'
+DB_SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 100))
+# 最多统计的语句类型数
+DB_PROFILE_MAX_SHAPES = int(os.environ.get('DB_PROFILE_MAX_SHAPES', 1000))
+
+# 全文检索：将文本切分为字符二元组（bigram），以支持中文检索
+_FTS_SEGMENT = re.compile(r'[^\W_]+')
+
+def fts_bigrams(text):
+    """将文本转换为空格分隔的二元组，供 news_fts 索引和查询使用"""
+    if not text:
+        return ''
+    tokens = []
+    for segment in _FTS_SEGMENT.findall(text.lower()):
+        if len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return ' '.join(tokens)
+
+def build_fts_query(search):
+    """将搜索词转换为FTS5查询，无法使用全文索引时返回None
+    
+    单个字符无法组成二元组，不在FTS查询中，调用方需用 like_terms 取出后按 LIKE 匹配。
+    """
+    phrases = []
+    for segment in _FTS_SEGMENT.findall(search.lower()):
+        if len(segment) > 1:
+            phrases.append('"' + fts_bigrams(segment) + '"')
+    return ' AND '.join(phrases) if phrases else None
+
+def like_terms(search):
+    """返回搜索词中的单字符词，与FTS查询一起按 AND 匹配"""
+    return [segment for segment in _FTS_SEGMENT.findall(search.lower()) if len(segment) == 1]
+
+# 语句分析：按语句形状（去掉字面量、合并 IN 列表后的SQL）汇总耗时和行数，每个进程单独统计
+_SHAPE_SPACES = re.compile(r'\s+')
+_SHAPE_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SHAPE_PARAMS = re.compile(r'\?(?:\s*,\s*\?)+')
+_EXPLAIN_OPERATIONS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def query_shape(sql):
+    """将SQL归一化为语句形状，参数值不同的同类语句归为一类"""
+    shape = _SHAPE_SPACES.sub(' ', sql).strip()
+    shape = _SHAPE_LITERALS.sub('?', shape)
+    return _SHAPE_PARAMS.sub('?, ...', shape)
+
+class QueryProfiler:
+    def __init__(self, slow_ms=DB_SLOW_QUERY_MS, max_shapes=DB_PROFILE_MAX_SHAPES):
+        self.slow_ms = slow_ms
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, conn, sql, parameters, seconds, rows):
+        """记录一条语句的执行结果，慢语句写入日志"""
+        shape = query_shape(sql)
+        elapsed_ms = seconds * 1000
+        slow = elapsed_ms >= self.slow_ms
+        with self._lock:
+            entry = self._stats.get(shape)
+            if entry is None:
+                if len(self._stats) >= self.max_shapes:
+                    return
+                entry = self._stats[shape] = {
+                    'shape': shape, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'rows': 0, 'slow_count': 0, 'plan': None, 'slow_params': None
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['rows'] += rows
+            if slow:
+                entry['slow_count'] += 1
+                entry['slow_params'] = _format_params(parameters)
+            need_plan = slow and entry['plan'] is None
+        if not slow:
+            return
+        
+        plan = self.explain(conn, sql, parameters) if need_plan else entry['plan']
+        if need_plan:
+            with self._lock:
+                entry['plan'] = plan
+        logger.warning(
+            f"慢查询 {elapsed_ms:.1f}ms，{rows} 行: {shape}\n"
+            f"参数: {_format_params(parameters)}\n查询计划:\n{plan or '（无）'}"
+        )
+
+    def explain(self, conn, sql, parameters):
+        """返回语句的 EXPLAIN QUERY PLAN 输出，每行一个步骤"""
+        if not sql.lstrip().upper().startswith(_EXPLAIN_OPERATIONS):
+            return None
+        try:
+            # 使用普通游标，避免分析 EXPLAIN 语句本身
+            cursor = conn.cursor(sqlite3.Cursor)
+            rows = cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            return f"无法获取查询计划: {e}"
+        depth = {0: 0}
+        lines = []
+        for node_id, parent_id, _, detail in rows:
+            depth[node_id] = depth.get(parent_id, 0) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return '\n'.join(lines)
+
+    def top(self, limit=20, sort='total'):
+        """返回按 total（总耗时）、max（最长耗时）或 mean（平均耗时）排序的前 limit 类语句"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._stats.values()]
+        for entry in entries:
+            entry['mean_ms'] = entry['total_ms'] / entry['count']
+        key = {'max': 'max_ms', 'mean': 'mean_ms'}.get(sort, 'total_ms')
+        entries.sort(key=lambda entry: entry[key], reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+def _format_params(parameters):
+    text = json.dumps(parameters, ensure_ascii=False, default=str)
+    return text if len(text) <= 500 else text[:500] + '...'
+
+profiler = QueryProfiler()
+
+# 记录每条语句执行耗时的游标和连接。开启 DB_PROFILE 时，查询语句的耗时和行数
+# 统计到结果读取完毕（或游标被重用、关闭）为止；只读取了部分结果的游标在连接归还连接池时记录。
+# 记录（含 EXPLAIN）总是在持有该连接的线程中同步执行，不在 __del__ 中执行：
+# 游标被回收时连接可能已归还，正被其他线程使用
+class TimedCursor(sqlite3.Cursor):
+    _profile = None
+
+    def execute(self, sql, parameters=()):
+        self._finish_profile()
+        start = time.perf_counter()
+        try:
+            result = super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.QUERY_SECONDS.labels(*metrics.query_labels(sql)).observe(elapsed)
+        if DB_PROFILE:
+            self._start_profile(sql, parameters, elapsed)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish_profile()
+        first = []
+        if DB_PROFILE:
+            # 批量语句的参数可能很多，只保留第一组用于慢查询日志和 EXPLAIN
+            seq_of_parameters = _remember_first(seq_of_parameters, first)
+        start = time.perf_counter()
+        try:
+            result = super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.QUERY_SECONDS.labels(*metrics.query_labels(sql)).observe(elapsed)
+        if DB_PROFILE:
+            self._start_profile(sql, first[0] if first else (), elapsed)
+        return result
+
+    def _start_profile(self, sql, parameters, elapsed):
+        profile = [sql, parameters, elapsed, 0]
+        if self.description is None:
+            # 非查询语句没有结果集，立即记录
+            profile[3] = max(self.rowcount, 0)
+            _record_profile(self.connection, profile)
+        else:
+            self._profile = profile
+            self.connection.pending_profiles[id(profile)] = profile
+
+    def _finish_profile(self):
+        profile = self._profile
+        if profile is None:
+            return
+        self._profile = None
+        # 连接归还连接池时已记录的不再重复记录
+        if self.connection.pending_profiles.pop(id(profile), None) is not None:
+            _record_profile(self.connection, profile)
+
+    def _timed_fetch(self, fetch, *args):
+        if self._profile is None:
+            return fetch(*args)
+        start = time.perf_counter()
+        result = fetch(*args)
+        self._profile[2] += time.perf_counter() - start
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if self._profile is not None:
+            if row is None:
+                self._finish_profile()
+            else:
+                self._profile[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed_fetch(super().fetchmany, size)
+        if self._profile is not None:
+            self._profile[3] += len(rows)
+            if len(rows) < size:
+                self._finish_profile()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._profile is not None:
+            self._profile[3] += len(rows)
+            self._finish_profile()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed_fetch(super().__next__)
+        except StopIteration:
+            self._finish_profile()
+            raise
+        if self._profile is not None:
+            self._profile[3] += 1
+        return row
+
+    def close(self):
+        self._finish_profile()
+        super().close()
+
+def _remember_first(seq_of_parameters, first):
+    """逐组传递参数，并将第一组保存到 first 中"""
+    for parameters in seq_of_parameters:
+        if not first:
+            first.append(parameters)
+        yield parameters
+
+def _record_profile(conn, profile):
+    try:
+        profiler.record(conn, *profile)
+    except Exception as e:
+        logger.warning(f"记录语句分析失败: {e}")
+
+class TimedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 结果尚未读取完毕的查询语句分析，以 id 为键
+        self.pending_profiles = {}
+
+    def finish_profiles(self):
+        """记录结果未读取完毕的查询语句，在持有连接的线程中调用"""
+        profiles, self.pending_profiles = self.pending_profiles, {}
+        for profile in profiles.values():
+            _record_profile(self, profile)
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+# 连接池：复用长连接，连接在进程 fork 后重新创建
+class ConnectionPool:
+    def __init__(self, path=DB_PATH, size=DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE,
+            factory=TimedConnection
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        # 全文索引触发器需要在每个连接上注册该函数，未注册的连接（如 sqlite3 命令行）无法写入 news 表
+        conn.create_function('fts_bigrams', 1, fts_bigrams, deterministic=True)
+        return conn
+
+    def acquire(self):
+        """取出一个连接，连接数已满时等待其他线程归还"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 出的子进程不能使用父进程的连接
+                self._reset()
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._created < self.size:
+                self._created += 1
+                idle = None
+            else:
+                idle = self._idle
+
+        if idle is not None:
+            try:
+                return idle.get(timeout=DB_BUSY_TIMEOUT)
+            except queue.Empty:
+                raise sqlite3.OperationalError("等待数据库连接超时")
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def release(self, conn):
+        """归还连接，未提交的事务会被回滚"""
+        if self._pid != os.getpid():
+            return
+        conn.finish_profiles()
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+pool = ConnectionPool()
+
+def connection():
+    """从连接池获取连接，用法：with storage.connection() as conn"""
+    return pool.connection()
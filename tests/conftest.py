@@ -0,0 +1,29 @@
+"""测试使用临时数据库，不启动定时爬取，不读写HTTP缓存目录"""
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 必须在导入 app、storage 之前设置
+_workdir = tempfile.mkdtemp(prefix='finance_news_tests_')
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+os.environ['DB_PATH'] = os.path.join(_workdir, 'test.db')
+os.environ['RUN_SCHEDULER'] = '0'
+os.environ['HTTP_CACHE_DIR'] = ''
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    app.init_db()
+    return app
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,60 @@
+import uuid
+
+import pytest
+
+TITLE = '央行宣布下调存款准备金率0.5个百分点'
+NEAR_DUPLICATE = '央行宣布下调存款准备金率0.5个百分点 释放长期资金'
+UNRELATED = '沪深两市成交额突破万亿元'
+
+def test_minhash(app_module):
+    similarity = app_module.minhash_similarity
+    assert similarity(app_module.minhash(TITLE), app_module.minhash(TITLE)) == 1
+    assert similarity(app_module.minhash(TITLE), app_module.minhash(NEAR_DUPLICATE)) >= app_module.MINHASH_THRESHOLD
+    assert similarity(app_module.minhash(TITLE), app_module.minhash(UNRELATED)) < app_module.MINHASH_THRESHOLD
+    # 二元组太少时不计算签名
+    assert app_module.minhash('央行') is None
+
+@pytest.fixture(scope='module')
+def clustered_news(app_module):
+    tag = uuid.uuid4().hex[:8]
+    sources = {'first': f'甲{tag}', 'second': f'乙{tag}'}
+    for title, source in [(TITLE, 'first'), (NEAR_DUPLICATE, 'second'), (UNRELATED, 'first')]:
+        app_module.ingest_news([{
+            'title': title, 'content': '', 'source': sources[source],
+            'url': f'http://example.com/{uuid.uuid4().hex}'
+        }])
+    return sources
+
+def fetch(client, **params):
+    params['_'] = uuid.uuid4().hex
+    response = client.get('/api/news', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+def titles(data):
+    return [news['title'] for news in data['data']]
+
+def test_near_duplicates_share_cluster(client, clustered_news):
+    first = fetch(client, source=clustered_news['first'])['data']
+    second = fetch(client, source=clustered_news['second'])['data']
+    original = next(news for news in first if news['title'] == TITLE)
+    unrelated = next(news for news in first if news['title'] == UNRELATED)
+    assert original['cluster_id'] == original['id']
+    assert second[0]['cluster_id'] == original['id']
+    assert unrelated['cluster_id'] is None
+
+def test_collapse_picks_representative_within_source(client, clustered_news):
+    # 组内最早的一条来自其他来源，按来源筛选时仍返回本来源的一条
+    data = fetch(client, source=clustered_news['second'], collapse='1')
+    assert titles(data) == [NEAR_DUPLICATE]
+    assert data['total'] == 1
+    assert sorted(titles(fetch(client, source=clustered_news['first'], collapse='1'))) == sorted([TITLE, UNRELATED])
+
+def test_collapse_picks_representative_within_search(client, clustered_news):
+    assert titles(fetch(client, search='释放长期资金', collapse='1')) == [NEAR_DUPLICATE]
+    assert titles(fetch(client, search='准备金率', collapse='1', sort='relevance')) == [TITLE]
+
+def test_collapse_with_cursor(client, clustered_news):
+    data = fetch(client, source=clustered_news['second'], collapse='1', cursor='')
+    assert titles(data) == [NEAR_DUPLICATE]
+    assert data['next_cursor'] is None
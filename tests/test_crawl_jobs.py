@@ -0,0 +1,43 @@
+import uuid
+
+import pytest
+
+import storage
+
+@pytest.fixture
+def stale_job(app_module, monkeypatch):
+    """执行进程已退出的任务：状态为 running，进度很久没有更新"""
+    monkeypatch.setattr(app_module, 'run_crawl_job', lambda job_id: None)
+    job_id = uuid.uuid4().hex
+    with storage.connection() as conn:
+        # 避免之前的测试留下的执行中任务
+        conn.execute("UPDATE crawl_jobs SET status = 'done' WHERE status = 'running'")
+        conn.execute('''
+            INSERT INTO crawl_jobs (id, status, progress, updated_at)
+            VALUES (?, 'running', '{}', datetime('now', ?))
+        ''', (job_id, f'-{app_module.CRAWL_JOB_STALE_SECONDS + 60} seconds'))
+        conn.commit()
+    yield job_id
+    with storage.connection() as conn:
+        conn.execute("UPDATE crawl_jobs SET status = 'done' WHERE status = 'running'")
+        conn.commit()
+
+def stored_status(job_id):
+    with storage.connection() as conn:
+        return conn.execute("SELECT status FROM crawl_jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+def test_stale_job_reported_as_abandoned(client, stale_job):
+    body = client.get(f'/api/crawl/{stale_job}').get_json()
+    assert body['status'] == 'abandoned'
+    assert body['error']
+    # 查询不修改数据库
+    assert stored_status(stale_job) == 'running'
+
+def test_new_job_replaces_and_persists_abandoned(app_module, stale_job):
+    job_id, created = app_module.start_crawl_job()
+    assert created and job_id != stale_job
+    assert stored_status(stale_job) == 'abandoned'
+    assert app_module.get_crawl_job(job_id)['status'] == 'running'
+
+    # 新任务进行中时不会重复创建
+    assert app_module.start_crawl_job() == (job_id, False)
@@ -0,0 +1,170 @@
+import sqlite3
+import threading
+import time
+import uuid
+
+import pytest
+import requests
+
+import storage
+
+def make_response(url, body, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response._content = body.encode('utf-8')
+    # 详情页通过 iter_content 读取
+    response._content_consumed = True
+    return response
+
+@pytest.fixture
+def site(app_module, tmp_path, monkeypatch):
+    """只有一页列表的东方财富网，请求可以设置为连接失败（failing）或返回错误状态码（statuses）"""
+    monkeypatch.setattr(app_module, 'CRAWL_INCREMENTAL', True)
+    spec = app_module.SOURCES['东方财富网']
+    prefix = f'https://finance.eastmoney.com/a/{uuid.uuid4().hex}'
+    articles = [f'{prefix}{i}.html' for i in range(3)]
+    list_html = ''.join(
+        f'<p class="title"><a href="{url}">新闻{i}</a></p>' for i, url in enumerate(articles)
+    )
+    pages = {spec['list_url']: list_html}
+    for url in articles:
+        pages[url] = '<div class="newsContent">正文</div>'
+    failing = set()
+    statuses = {}
+
+    crawler = app_module.FinanceNewsCrawler()
+    crawler.http_cache = app_module.HttpCache(str(tmp_path))
+    crawler.limiter = app_module.DomainLimiter(rate=1000, burst=100)
+
+    def fetch(url, **kwargs):
+        if url in failing:
+            raise requests.ConnectionError('模拟失败')
+        if url in pages:
+            return make_response(url, pages[url], statuses.get(url, 200))
+        # 第2页起为空
+        return make_response(url, '<html></html>')
+
+    monkeypatch.setattr(crawler, 'fetch', fetch)
+    return crawler, articles, failing, statuses
+
+def test_list_cache_saved_only_after_ingest(app_module, site):
+    crawler, articles, _, _ = site
+    news = crawler.crawl_source('东方财富网')
+    assert sorted(item['url'] for item in news) == articles
+    list_url = app_module.SOURCES['东方财富网']['list_url']
+    assert crawler.http_cache.load(list_url) == {}
+
+    app_module.ingest_news(news)
+    crawler.save_list_cache()
+    assert crawler.http_cache.load(list_url)['content_hash']
+    assert crawler.crawl_source('东方财富网') == []
+
+def test_failed_detail_keeps_page_uncached(app_module, site):
+    crawler, articles, failing, _ = site
+    failing.add(articles[1])
+    news = crawler.crawl_source('东方财富网')
+    assert len(news) == 2
+    app_module.ingest_news(news)
+    crawler.save_list_cache()
+    list_url = app_module.SOURCES['东方财富网']['list_url']
+    assert crawler.http_cache.load(list_url) == {}
+
+    # 下次爬取重新读取该页，补上失败的新闻
+    failing.clear()
+    news = crawler.crawl_source('东方财富网')
+    assert [item['url'] for item in news] == [articles[1]]
+
+def test_error_status_detail_is_retried(app_module, site):
+    crawler, articles, _, statuses = site
+    statuses[articles[1]] = 503
+    news = crawler.crawl_source('东方财富网')
+    # 错误页面不作为正文保存
+    assert sorted(item['url'] for item in news) == [articles[0], articles[2]]
+    app_module.ingest_news(news)
+    crawler.save_list_cache()
+    assert crawler.http_cache.load(app_module.SOURCES['东方财富网']['list_url']) == {}
+
+    statuses.clear()
+    news = crawler.crawl_source('东方财富网')
+    assert [item['url'] for item in news] == [articles[1]]
+    assert news[0]['content'] == '正文'
+
+def test_failed_ingest_keeps_page_uncached(app_module, site, monkeypatch):
+    crawler, articles, _, _ = site
+    write_news = app_module.write_news
+
+    def failing_write(conn, news_list):
+        raise sqlite3.OperationalError('模拟写入失败')
+
+    monkeypatch.setattr(app_module, 'write_news', failing_write)
+    schedule = [{
+        'source': '东方财富网', 'interval_seconds': app_module.SCHEDULE_MIN_INTERVAL,
+        'next_run': '2000-01-01 00:00:00', 'last_run': None, 'last_found': None,
+        'last_added': None, 'error_count': 0, 'last_error': None
+    }]
+    app_module.crawl_due_sources(crawler, schedule)
+    # 写入失败时不保存缓存记录
+    assert crawler.http_cache.load(app_module.SOURCES['东方财富网']['list_url']) == {}
+
+    # 下次爬取仍返回这些新闻
+    monkeypatch.setattr(app_module, 'write_news', write_news)
+    news = crawler.crawl_source('东方财富网')
+    assert sorted(item['url'] for item in news) == articles
+
+def test_error_status_list_page_is_an_error(app_module, site):
+    crawler, _, _, statuses = site
+    list_url = app_module.SOURCES['东方财富网']['list_url']
+    statuses[list_url] = 503
+    assert crawler.crawl_source('东方财富网') == []
+    assert '503' in crawler.errors['东方财富网']
+    assert crawler.http_cache.load(list_url) == {}
+
+    # 调度按失败退避，而不是视为没有新闻
+    app_module.ensure_schedule(['东方财富网'])
+    with storage.connection() as conn:
+        conn.execute(
+            "UPDATE crawl_schedule SET error_count = 0, next_run = '2000-01-01 00:00:00' WHERE source = ?",
+            ('东方财富网',)
+        )
+        conn.commit()
+    schedule = [entry for entry in app_module.get_schedule() if entry['source'] == '东方财富网']
+    app_module.crawl_due_sources(crawler, schedule)
+    entry, = [entry for entry in app_module.get_schedule() if entry['source'] == '东方财富网']
+    assert entry['error_count'] == 1
+    assert '503' in entry['last_error']
+
+class SlowResponse(requests.Response):
+    """读取响应体时记录同时读取的个数"""
+    def __init__(self, url, readers):
+        super().__init__()
+        self.status_code = 200
+        self.url = url
+        self.headers['Content-Type'] = 'text/html; charset=utf-8'
+        self.readers = readers
+        self._content_consumed = True
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        with self.readers['lock']:
+            self.readers['active'] += 1
+            self.readers['max'] = max(self.readers['max'], self.readers['active'])
+        try:
+            time.sleep(0.05)
+            yield '<div class="newsContent">正文</div>'.encode('utf-8')
+        finally:
+            with self.readers['lock']:
+                self.readers['active'] -= 1
+
+def test_host_concurrency_covers_streamed_body(app_module, monkeypatch):
+    readers = {'lock': threading.Lock(), 'active': 0, 'max': 0}
+    crawler = app_module.FinanceNewsCrawler()
+    crawler.limiter = app_module.DomainLimiter(concurrency=1, rate=1000, burst=100)
+    monkeypatch.setattr(crawler.session, 'get', lambda url, **kwargs: SlowResponse(url, readers))
+    news_list = [
+        {'title': f'新闻{i}', 'source': '东方财富网', 'url': f'https://finance.eastmoney.com/a/{i}.html'}
+        for i in range(4)
+    ]
+    news = crawler.fetch_details(news_list, lambda response: crawler.parse_detail('东方财富网', response))
+    assert [item['content'] for item in news] == ['正文'] * 4
+    assert readers['max'] == 1
@@ -0,0 +1,69 @@
+import uuid
+
+import pytest
+
+def test_cursor_round_trip(app_module):
+    token = app_module.encode_cursor({'created_at': '2024-01-02 03:04:05', 'id': 42})
+    assert app_module.decode_cursor(token) == ('2024-01-02 03:04:05', 42)
+
+@pytest.mark.parametrize('token', ['', 'not-base64!', 'WzFd'])
+def test_invalid_cursor(app_module, token):
+    with pytest.raises(ValueError):
+        app_module.decode_cursor(token)
+
+def test_invalid_cursor_returns_400(client):
+    response = client.get('/api/news', query_string={'cursor': 'bad', '_': uuid.uuid4().hex})
+    assert response.status_code == 400
+
+@pytest.fixture
+def source_news(app_module):
+    """同一来源的 7 条新闻，写入时间相同，只能靠 id 区分先后"""
+    source = f'分页测试{uuid.uuid4().hex[:6]}'
+    app_module.ingest_news([
+        {'title': f'分页新闻{i}', 'content': '', 'source': source,
+         'url': f'http://example.com/page/{source}/{i}'}
+        for i in range(7)
+    ])
+    return source
+
+def test_cursor_pages_cover_all_rows_in_order(client, source_news):
+    ids = []
+    cursor = ''
+    pages = 0
+    while cursor is not None:
+        body = client.get('/api/news', query_string={
+            'source': source_news, 'limit': 3, 'cursor': cursor, '_': uuid.uuid4().hex
+        }).get_json()
+        ids.extend(news['id'] for news in body['data'])
+        cursor = body['next_cursor']
+        pages += 1
+    assert pages == 3
+    assert len(ids) == 7 and ids == sorted(ids, reverse=True)
+
+    # 与页码分页的结果一致
+    body = client.get('/api/news', query_string={
+        'source': source_news, 'limit': 10, 'page': 1, '_': uuid.uuid4().hex
+    }).get_json()
+    assert [news['id'] for news in body['data']] == ids
+    assert body['total'] == 7
+
+@pytest.mark.parametrize('params', [
+    {'limit': 0, 'cursor': ''},
+    {'limit': -1, 'cursor': ''},
+    {'limit': 'abc'},
+    {'page': 0},
+    {'page': -2, 'limit': 5},
+])
+def test_invalid_page_args(client, params):
+    params['_'] = uuid.uuid4().hex
+    response = client.get('/api/news', query_string=params)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert client.get('/', query_string=params).status_code == 400
+
+def test_limit_is_capped(client, app_module, source_news, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_PAGE_LIMIT', 2)
+    body = client.get('/api/news', query_string={
+        'source': source_news, 'limit': 1000, 'cursor': '', '_': uuid.uuid4().hex
+    }).get_json()
+    assert len(body['data']) == 2 and body['next_cursor']
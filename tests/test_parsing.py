@@ -0,0 +1,157 @@
+import os
+
+import pytest
+
+import parsing
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures')
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read().replace('{page}', '1')
+
+@pytest.fixture(params=['html.parser', 'lxml'])
+def html_parser(request, monkeypatch):
+    monkeypatch.setattr(parsing, 'HTML_PARSER', request.param)
+    return request.param
+
+@pytest.mark.parametrize('name, fixture, count', [
+    ('东方财富网', 'eastmoney_list.html', 20),
+    ('新浪财经', 'sina_list.html', 50),
+    ('财经网', 'caijing_list.html', 30),
+    ('界面新闻', 'jiemian_list.html', 20),
+])
+def test_parse_list_page(app_module, html_parser, name, fixture, count):
+    spec = app_module.SOURCES[name]
+    news_list = parsing.parse_list_page(spec, name, load_fixture(fixture))
+    assert len(news_list) == count
+    for news in news_list:
+        assert news['title'] and news['source'] == name
+        assert news['url'].startswith('http')
+        assert news['content'] == spec['default_content']
+
+def test_sina_list_skips_navigation(app_module, html_parser):
+    news_list = parsing.parse_list_page(app_module.SOURCES['新浪财经'], '新浪财经', load_fixture('sina_list.html'))
+    assert not [news for news in news_list if '/channel/' in news['url']]
+
+def test_item_strainer_matches_multiple_classes(html_parser):
+    html = '<p class="title red"><a href="/a">甲</a></p><p class="subtitle"><a href="/b">乙</a></p>'
+    spec = {'item': ('p', 'title'), 'base_url': 'http://example.com/', 'default_content': ''}
+    assert [news['url'] for news in parsing.parse_list_page(spec, 'x', html)] == ['http://example.com/a']
+
+def crash_once(marker):
+    """第一次调用时结束解析进程，之后返回进程号"""
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return os.getpid()
+
+def test_parse_pool_recovers_from_crashed_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(parsing, 'PARSE_MODE', 'process')
+    pool = parsing.ParsePool(workers=1)
+    try:
+        assert pool.run(crash_once, str(tmp_path / 'marker')) != os.getpid()
+        # 重试后的进程池可继续使用
+        assert pool.run(crash_once, str(tmp_path / 'marker')) != os.getpid()
+    finally:
+        pool._get().shutdown()
+
+def chunked(data, size, consumed=None):
+    for i in range(0, len(data), size):
+        if consumed is not None:
+            consumed.append(size)
+        yield data[i:i + size]
+
+@pytest.fixture
+def detail_spec(app_module):
+    return dict(app_module.SOURCES['东方财富网'], detail_chars=100000)
+
+@pytest.mark.parametrize('size', [1, 7, 100, parsing.CHARSET_SNIFF_BYTES, 100000])
+def test_extract_detail_chunk_sizes(detail_spec, size):
+    with open(os.path.join(FIXTURES, 'eastmoney_detail.html'), 'rb') as f:
+        content = f.read()
+    text = parsing.extract_detail(detail_spec, chunked(content, size))
+    assert text.startswith('北向资金加码布局一季度业绩预告')
+    assert text.endswith('业内人士：短期内波动加大。')
+    assert '频道' not in text
+
+def test_extract_detail_stops_after_target(detail_spec):
+    with open(os.path.join(FIXTURES, 'eastmoney_detail.html'), 'rb') as f:
+        content = f.read()
+    consumed = []
+    parsing.extract_detail(detail_spec, chunked(content, 512, consumed))
+    # 正文元素结束后不再读取页面末尾的相关链接
+    assert sum(consumed) < len(content)
+
+def test_extract_detail_truncates(app_module):
+    spec = dict(app_module.SOURCES['东方财富网'], detail_chars=10)
+    content = '<html><body><div class="newsContent">{}</div>{}</body></html>'.format(
+        '央行' * 100, '<p>尾部</p>' * 2000
+    ).encode('utf-8')
+    consumed = []
+    assert parsing.extract_detail(spec, chunked(content, 256, consumed)) == '央行' * 5 + '...'
+    # 正文超过字数上限后即停止读取
+    assert sum(consumed) < len(content)
+
+def test_extract_detail_default_content(detail_spec):
+    content = b'<html><body><div class="other">' + b'x' * 10000 + b'</div></body></html>'
+    assert parsing.extract_detail(detail_spec, chunked(content, 1000)) == detail_spec['default_content']
+
+def test_extract_detail_short_page(detail_spec):
+    # 不足 CHARSET_SNIFF_BYTES 字节的页面在读取完毕后解析
+    content = '<div class="newsContent">短正文</div>'.encode('utf-8')
+    assert parsing.extract_detail(detail_spec, chunked(content, 5)) == '短正文'
+
+@pytest.mark.parametrize('size', [1, 3, 1000])
+def test_extract_detail_gbk_split_characters(detail_spec, size):
+    # 多字节字符被切分在块之间，以及编码检测的边界上
+    body = '正文' * 3000
+    content = (
+        '<html><head><meta charset="gbk"></head><body><p>' + '前' * parsing.CHARSET_SNIFF_BYTES
+        + '</p><div class="newsContent">' + body + '</div></body></html>'
+    ).encode('gbk')
+    assert parsing.extract_detail(detail_spec, chunked(content, size)) == body
+
+@pytest.fixture
+def charset_cache(monkeypatch):
+    cache = {}
+    monkeypatch.setattr(parsing, 'charset_cache', cache)
+    return cache
+
+GBK_PAGE = '<html><body>中文内容，财经新闻</body></html>'
+LATIN1_PAGE = '<html><body>caf\xe9 cr\xe8me</body></html>'
+
+def test_is_single_byte():
+    assert parsing.is_single_byte('cp1252') and parsing.is_single_byte('iso8859-1')
+    assert not parsing.is_single_byte('utf-8') and not parsing.is_single_byte('gb18030')
+
+def test_decode_html_declared_charsets(charset_cache):
+    page = GBK_PAGE.encode('gbk')
+    assert parsing.decode_html(page, 'text/html; charset=GBK', 'h1') == GBK_PAGE
+    meta = '<meta charset="gb2312">'.encode('ascii') + page
+    assert parsing.decode_html(meta, None, 'h2').endswith(GBK_PAGE)
+    assert charset_cache == {'h1': 'gb18030', 'h2': 'gb18030'}
+    # 之后没有声明编码的页面使用该主机缓存的编码
+    assert parsing.decode_html(page, None, 'h1') == GBK_PAGE
+
+def test_decode_html_does_not_cache_single_byte(charset_cache):
+    # 完整检测的结果为单字节编码（如 cp1250），不缓存
+    assert parsing.decode_html(b'<html>caf\xe9</html>', None, 'h3').startswith('<html>caf')
+    assert 'h3' not in charset_cache
+    assert parsing.decode_html(GBK_PAGE.encode('gbk'), None, 'h3') == GBK_PAGE
+    assert charset_cache['h3'] == 'gb18030'
+
+def test_decode_html_single_byte_header(charset_cache):
+    # 单字节编码的声明可能是错的，先严格尝试 DETECT_CHARSETS
+    header = 'text/html; charset=iso-8859-1'
+    assert parsing.decode_html(GBK_PAGE.encode('gbk'), header, 'h4') == GBK_PAGE
+    assert parsing.decode_html(LATIN1_PAGE.encode('latin-1'), header, 'h5') == LATIN1_PAGE
+    assert charset_cache == {'h4': 'gb18030'}
+
+def test_resolve_charset(charset_cache):
+    # 页面开头截断在 UTF-8 多字节字符中间
+    head = ('<html>' + '中文' * 10).encode('utf-8')[:-1]
+    assert parsing.resolve_charset(head, None, 'h6') == 'utf-8'
+    assert parsing.resolve_charset(GBK_PAGE.encode('gbk'), 'text/html; charset=latin-1', 'h7') == 'gb18030'
+    assert parsing.resolve_charset(LATIN1_PAGE.encode('latin-1'), 'text/html; charset=latin-1', 'h8') == 'iso8859-1'
+    assert charset_cache == {'h6': 'utf-8', 'h7': 'gb18030'}
@@ -0,0 +1,57 @@
+import gc
+import json
+
+import pytest
+
+import storage
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, 'DB_PROFILE', True)
+    # 所有语句都视为慢查询，以便获取查询计划
+    monkeypatch.setattr(storage, 'profiler', storage.QueryProfiler(slow_ms=0))
+    pool = storage.ConnectionPool(str(tmp_path / 'profile.db'), size=1)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+        conn.executemany("INSERT INTO t (a, b) VALUES (?, ?)", [(i, str(i)) for i in range(5)])
+        conn.commit()
+    storage.profiler.reset()
+    return pool
+
+def stats(shape_prefix):
+    return [entry for entry in storage.profiler.top(100) if entry['shape'].startswith(shape_prefix)]
+
+def test_executemany_explains_first_row(pool):
+    with pool.connection() as conn:
+        conn.executemany("UPDATE t SET b = ? WHERE a = ?", ((str(i), i) for i in range(3)))
+        conn.commit()
+    entry, = stats('UPDATE t')
+    assert entry['count'] == 1
+    assert entry['rows'] == 3
+    assert json.loads(entry['slow_params']) == ['0', 0]
+    assert 'SCAN t' in entry['plan']
+
+def test_partial_read_recorded_on_release(pool):
+    with pool.connection() as conn:
+        conn.execute("SELECT a FROM t ORDER BY a").fetchone()
+        gc.collect()
+        # 被丢弃的游标不在回收时记录
+        assert stats('SELECT a FROM t') == []
+    entry, = stats('SELECT a FROM t')
+    assert (entry['count'], entry['rows']) == (1, 1)
+    assert 'SCAN t' in entry['plan']
+
+def test_profile_not_recorded_twice(pool):
+    with pool.connection() as conn:
+        cursor = conn.execute("SELECT a FROM t")
+        cursor.fetchone()
+    cursor.close()
+    entry, = stats('SELECT a FROM t')
+    assert entry['count'] == 1
+
+def test_fully_read_cursor_recorded_immediately(pool):
+    with pool.connection() as conn:
+        conn.execute("SELECT b FROM t").fetchall()
+        entry, = stats('SELECT b FROM t')
+        assert (entry['count'], entry['rows']) == (1, 5)
+        assert conn.pending_profiles == {}
@@ -0,0 +1,24 @@
+import uuid
+
+def test_cache_invalidated_by_ingest(client, app_module):
+    source = f'缓存测试{uuid.uuid4().hex[:6]}'
+    params = {'source': source, 'limit': 5}
+
+    first = client.get('/api/news', query_string=params)
+    assert first.status_code == 200 and first.get_json()['data'] == []
+    etag = first.headers['ETag']
+    # 数据未变化时返回同一缓存
+    assert client.get('/api/news', query_string=params).headers['ETag'] == etag
+
+    app_module.ingest_news([
+        {'title': '缓存测试新闻', 'content': '', 'source': source, 'url': f'http://example.com/{uuid.uuid4().hex}'}
+    ])
+    second = client.get('/api/news', query_string=params)
+    assert [news['title'] for news in second.get_json()['data']] == ['缓存测试新闻']
+    assert second.headers['ETag'] != etag
+
+    not_modified = client.get('/api/news', query_string=params, headers={'If-None-Match': second.headers['ETag']})
+    assert not_modified.status_code == 304
+    assert not_modified.headers['ETag'] == second.headers['ETag']
+    # 旧的 ETag 不再命中
+    assert client.get('/api/news', query_string=params, headers={'If-None-Match': etag}).status_code == 200
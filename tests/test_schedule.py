@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+@pytest.fixture
+def schedule(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'SCHEDULE_JITTER', 0)
+    monkeypatch.setattr(app_module, 'SCHEDULE_MIN_INTERVAL', 300)
+    monkeypatch.setattr(app_module, 'SCHEDULE_MAX_INTERVAL', 6 * 3600)
+    monkeypatch.setattr(app_module, 'SCHEDULE_BUSY_THRESHOLD', 5)
+
+    def run(interval, added, error=None, error_count=0):
+        before = datetime.utcnow()
+        new_interval, next_run, new_error_count = app_module.next_schedule(
+            {'interval_seconds': interval, 'error_count': error_count}, added, error
+        )
+        delay = (next_run - before).total_seconds()
+        return new_interval, round(delay), new_error_count
+    return run
+
+def test_busy_source_halves_interval(schedule):
+    assert schedule(3600, 5) == (1800, 1800, 0)
+    assert schedule(400, 10) == (300, 300, 0)
+
+def test_quiet_source_grows_interval(schedule):
+    assert schedule(3600, 0) == (5400, 5400, 0)
+    assert schedule(20000, 0) == (6 * 3600, 6 * 3600, 0)
+
+def test_moderate_source_keeps_interval(schedule):
+    assert schedule(3600, 2) == (3600, 3600, 0)
+
+def test_failures_back_off_exponentially(schedule):
+    assert schedule(600, 0, '超时', error_count=0) == (600, 1200, 1)
+    assert schedule(600, 0, '超时', error_count=1) == (600, 2400, 2)
+    # 退避不超过上限，间隔本身不变
+    assert schedule(600, 0, '超时', error_count=20) == (600, 6 * 3600, 21)
+
+def test_success_resets_error_count(schedule):
+    assert schedule(600, 1, error_count=3) == (600, 600, 0)
+
+def test_jitter_bounds(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'SCHEDULE_JITTER', 0.1)
+    for _ in range(50):
+        before = datetime.utcnow()
+        _, next_run, _ = app_module.next_schedule({'interval_seconds': 1000, 'error_count': 0}, 2)
+        assert 899 <= (next_run - before).total_seconds() <= 1101
@@ -0,0 +1,64 @@
+import sqlite3
+import uuid
+
+import pytest
+
+import storage
+
+def test_fts_bigrams():
+    assert storage.fts_bigrams('央行降准') == '央行 行降 降准'
+    assert storage.fts_bigrams('A股 上涨') == 'a股 上涨'
+    assert storage.fts_bigrams('') == ''
+
+def test_build_fts_query():
+    assert storage.build_fts_query('央行 降准') == '"央行" AND "降准"'
+    assert storage.build_fts_query('存款准备金') == '"存款 款准 准备 备金"'
+    # 单字符的词不在FTS查询中
+    assert storage.build_fts_query('A 股市') == '"股市"'
+    assert storage.build_fts_query('股') is None
+    assert storage.build_fts_query('!!') is None
+
+def test_like_terms():
+    assert storage.like_terms('A 股市') == ['a']
+    assert storage.like_terms('央行 降准') == []
+    assert storage.like_terms('股 A') == ['股', 'a']
+
+@pytest.fixture
+def search_news(app_module):
+    tag = uuid.uuid4().hex[:8]
+    rows = [
+        (f'{tag} X类股市快讯', 'http://example.com/a'),
+        (f'{tag} Y类股市快讯', 'http://example.com/b'),
+    ]
+    app_module.ingest_news([
+        {'title': title, 'content': '', 'source': '测试', 'url': f'{url}/{tag}'}
+        for title, url in rows
+    ])
+    return tag
+
+def search_titles(client, search):
+    response = client.get('/api/news', query_string={'search': search, 'limit': 50, '_': uuid.uuid4().hex})
+    return sorted(news['title'] for news in response.get_json()['data'])
+
+def test_single_char_term_is_not_dropped(client, search_news):
+    tag = search_news
+    assert search_titles(client, f'{tag} 股市') == [f'{tag} X类股市快讯', f'{tag} Y类股市快讯']
+    assert search_titles(client, f'{tag} X 股市') == [f'{tag} X类股市快讯']
+
+def test_only_single_char_terms(client, search_news):
+    tag = search_news
+    assert search_titles(client, f'{tag} Y') == [f'{tag} Y类股市快讯']
+
+def test_trigger_requires_registered_function(app_module):
+    conn = sqlite3.connect(storage.DB_PATH)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match='fts_bigrams'):
+            conn.execute("INSERT INTO news (title, content, source, url) VALUES ('t', '', 's', ?)",
+                         (f'http://example.com/{uuid.uuid4().hex}',))
+        conn.rollback()
+        conn.create_function('fts_bigrams', 1, storage.fts_bigrams, deterministic=True)
+        conn.execute("INSERT INTO news (title, content, source, url) VALUES ('t', '', 's', ?)",
+                     (f'http://example.com/{uuid.uuid4().hex}',))
+        conn.rollback()
+    finally:
+        conn.close()
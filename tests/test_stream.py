@@ -0,0 +1,64 @@
+import json
+import uuid
+
+import pytest
+
+@pytest.fixture
+def stream_news(app_module):
+    source = f'推送{uuid.uuid4().hex[:8]}'
+    app_module.ingest_news([
+        {'title': f'推送测试新闻{i}', 'content': '', 'source': source, 'url': f'http://example.com/{uuid.uuid4().hex}'}
+        for i in range(5)
+    ])
+    data = app_module.app.test_client().get(
+        '/api/news', query_string={'source': source, 'limit': 10, '_': uuid.uuid4().hex}
+    ).get_json()['data']
+    return source, sorted(news['id'] for news in data)
+
+def read_events(response, count):
+    """读取 count 个 SSE 事件（不含开头的 retry），返回 (事件名, id, data) 列表"""
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+    events = []
+    for _ in range(count):
+        fields = dict(
+            line.split(': ', 1) for line in next(chunks).decode('utf-8').strip().split('\n')
+        )
+        events.append((fields['event'], int(fields['id']), json.loads(fields['data'])))
+    return events
+
+def test_replay_after_last_event_id(client, stream_news):
+    source, ids = stream_news
+    response = client.get('/api/stream', query_string={'source': source}, headers={'Last-Event-ID': str(ids[0])})
+    try:
+        events = read_events(response, 4)
+    finally:
+        response.close()
+    assert [(event, news_id) for event, news_id, _ in events] == [('news', news_id) for news_id in ids[1:]]
+
+def test_replay_is_capped_with_reset(client, app_module, stream_news, monkeypatch):
+    monkeypatch.setattr(app_module, 'STREAM_REPLAY_LIMIT', 2)
+    source, ids = stream_news
+    response = client.get('/api/stream', query_string={'source': source, 'last_id': ids[0] - 1})
+    try:
+        events = read_events(response, 3)
+    finally:
+        response.close()
+    assert events[0] == ('reset', ids[2], {'last_id': ids[2]})
+    assert [(event, news_id) for event, news_id, _ in events[1:]] == [('news', ids[3]), ('news', ids[4])]
+
+def test_stream_client_limit(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'STREAM_MAX_CLIENTS', 1)
+    first = client.get('/api/stream')
+    try:
+        assert first.status_code == 200
+        busy = client.get('/api/stream')
+        assert busy.status_code == 503
+        assert busy.headers['Retry-After'] == str(int(app_module.STREAM_BUSY_RETRY))
+        assert busy.get_data().startswith(b'retry: ')
+    finally:
+        first.close()
+    # 关闭连接后释放名额，即使生成器从未开始执行
+    second = client.get('/api/stream')
+    second.close()
+    assert second.status_code == 200
@@ -0,0 +1,59 @@
+import sqlite3
+import uuid
+
+import pytest
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTP://Finance.EastMoney.com:80/a/1.html#top', 'http://finance.eastmoney.com/a/1.html'),
+    ('https://www.jiemian.com:443/article/1.html/', 'https://www.jiemian.com/article/1.html'),
+    ('https://example.com:8443/a', 'https://example.com:8443/a'),
+    ('https://example.com', 'https://example.com/'),
+    ('https://example.com/a?b=2&utm_source=x&a=1&spm=abc', 'https://example.com/a?a=1&b=2'),
+    ('  https://example.com/a  ', 'https://example.com/a'),
+    ('/relative/path', '/relative/path'),
+    ('', ''),
+])
+def test_canonicalize_url(app_module, url, expected):
+    assert app_module.canonicalize_url(url) == expected
+
+def test_url_key_ignores_scheme(app_module):
+    assert app_module.url_key('http://example.com/a/') == app_module.url_key('https://EXAMPLE.com/a')
+    assert app_module.url_key('http://example.com/a') != app_module.url_key('http://example.com/b')
+
+def test_normalize_news_dedups_across_schemes(app_module):
+    items, invalid, duplicates = app_module.normalize_news([
+        {'title': 't', 'source': 's', 'url': 'http://example.com/a'},
+        {'title': 't', 'source': 's', 'url': 'https://example.com/a?utm_source=x'},
+        {'title': 't', 'source': 's', 'url': ''},
+    ])
+    assert [item[3] for item in items] == ['http://example.com/a']
+    assert (invalid, duplicates) == (1, 1)
+
+def test_known_urls_across_schemes(app_module):
+    path = f'example.com/{uuid.uuid4().hex}'
+    app_module.ingest_news([{'title': 't', 'content': '', 'source': '测试', 'url': f'http://{path}'}])
+    assert app_module.find_known_urls([f'https://{path}', f'https://{path}x']) == {f'https://{path}'}
+
+    result = app_module.ingest_news([{'title': 't', 'content': '', 'source': '测试', 'url': f'https://{path}'}])
+    assert result['inserted'] == 0
+
+def test_backfill_url_keys(app_module):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE news (id INTEGER PRIMARY KEY, url TEXT UNIQUE, url_key TEXT)")
+    conn.executemany("INSERT INTO news (id, url) VALUES (?, ?)", [
+        (1, 'https://example.com/a?utm_source=x'),
+        (2, 'http://example.com/a'),
+        (3, 'http://example.com/b'),
+    ])
+    app_module.backfill_url_keys(conn.cursor())
+    conn.execute("CREATE UNIQUE INDEX idx_news_url_key ON news (url_key)")
+    assert conn.execute("SELECT id, url_key FROM news ORDER BY id").fetchall() == [
+        (1, 'example.com/a'), (2, None), (3, 'example.com/b')
+    ]
+
+def test_seen_urls_warm_from_url_key(app_module):
+    path = f'example.com/{uuid.uuid4().hex}'
+    app_module.ingest_news([{'title': 't', 'content': '', 'source': '测试', 'url': f'http://{path}/?utm_source=x'}])
+    seen = app_module.SeenUrls()
+    assert seen.contains(f'https://{path}')
+    assert not seen.contains(f'https://{path}x')